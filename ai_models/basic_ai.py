@@ -29,21 +29,67 @@ class BasicAI_old:
 
 # ai_models/basic_ai.py
 
-from ai_models.dqn_ai import DQNAI
 import numpy as np
 
 def normalize(value, min_value, max_value):
     """Normalize value to the range [0, 1]."""
     return (value - min_value) / (max_value - min_value)
+
+def static_state_features(planet, lander, out):
+    """
+    Normalized planet and lander properties (constant during an episode): the first 9 entries of the state vector.
+    Written into out[..., :9]; planet and lander may also be a PlanetBatch and a LanderBatch (one row of out per lander).
+    """
+    out[..., 0] = normalize(planet.radius, 1000, 10000)  # Normalize radius (example range: 1000 to 10000)
+    out[..., 1] = normalize(planet.atmosphere_thickness, 500, 1500)  # Normalize atmosphere thickness
+    out[..., 2] = normalize(planet.air_ground_density, 0.5, 3.0)  # Normalize air density
+    out[..., 3] = normalize(planet.gravity_constant, 1, 20)  # Normalize gravity constant
+    out[..., 4] = normalize(lander.max_thrust, 500, 5000)  # Normalize max thrust
+    out[..., 5] = normalize(lander.max_fuel, 100, 1000)  # Normalize max fuel
+    out[..., 6] = normalize(lander.drag_coeff, 0.2, 0.8)  # Normalize drag coefficient
+    out[..., 7] = normalize(lander.surface_area, 1, 10)  # Normalize surface area
+    out[..., 8] = normalize(lander.mass, 52.5, 525)  # Normalize mass
+    return out
+
+def dynamic_state_features(x, y, vx, vy, angle, fuel, terrain_info, planet, landing_x_center, landing_y_center, out):
+    """
+    Normalized lander state (dx, dy, vx, vy, angle, fuel, terrain distances): the entries 9+ of the state vector.
+    Vectorized version of the computation of BasicAI.get_state_vector, written into out[..., 9:].
+    """
+    ground_length = planet.ground_length
+    # Distance to landing zone (the shortest way around the planet)
+    dx = x - landing_x_center
+    dx_wrapped = x + ground_length - landing_x_center
+    dx = np.where(np.abs(dx) < np.abs(dx_wrapped), dx, dx_wrapped)
+    dy = y - landing_y_center
+
+    out[..., 9] = (normalize(dx, -ground_length / 2, ground_length / 2)-0.5)*2
+    out[..., 10] = (normalize(dy, -planet.atmosphere_thickness, planet.atmosphere_thickness)-0.5)*2
+    out[..., 11] = normalize(vx, -500, 500)
+    out[..., 12] = normalize(vy, -500, 500)
+    out[..., 13] = (normalize(angle, -180, 180)-0.5)*2
+    out[..., 14] = normalize(fuel, 0, 100)
+    out[..., 15:] = terrain_info
+    return out
     
 class BasicAI:
-    def __init__(self, lander, planet):
+    def __init__(self, lander, planet, num_rays=5, action_repeat=1, policy=None, **dqn_options):
         self.lander = lander
         self.planet = planet
-        self.state_size = 4 + 5 + 2 + 2 + 1 + 1 + 5  # planet general info + lander general info + dx, dy, vx, vy, angle, fuel, terrain_info (assuming 5 rays)
+        self.num_rays = num_rays  # Number of terrain sensing rays
+        self.action_repeat = action_repeat  # Physics steps each chosen action is held for (frame skip)
+        self.held_thrust, self.held_angle = 0, 0  # Commands of the last chosen action (thrust, target angle)
+        self.state_size = 4 + 5 + 2 + 2 + 1 + 1 + num_rays  # planet general info + lander general info + dx, dy, vx, vy, angle, fuel, terrain_info
         self.action_size = 2  # Thrust and angle change
-        self.ai_model = DQNAI(lander, planet, self.state_size, self.action_size)
+        self.policy = policy  # Frozen greedy policy (e.g. NumpyPolicy) used instead of a DQNAI
+        if policy is None:
+            from ai_models.dqn_ai import DQNAI  # Imported here: running a frozen policy does not need torch
+            self.ai_model = DQNAI(lander, planet, self.state_size, self.action_size, **dqn_options)  # Extra DQNAI settings (e.g. prioritized=True)
+        else:
+            self.ai_model = None
         self.landing_x_center, self.landing_y_center = None, None
+        self.observations = np.zeros((2, self.state_size), dtype=np.float32)  # Alternating state vector buffers
+        self.observation_index = 0
         self.prepare_for_landing()
         
 
@@ -52,16 +98,27 @@ class BasicAI:
         self.estimate_initial_fuel()
         self.landing_x_center = (self.planet.landing_zone[0][0] + self.planet.landing_zone[1][0]) / 2
         self.landing_y_center = self.planet.landing_zone[0][1]
+        # State vector buffers: the planet and lander properties do not change during the episode
+        static_state_features(self.planet, self.lander, self.observations)
+        self.dx_scale = 2 / self.planet.ground_length
+        self.dy_scale = 1 / self.planet.atmosphere_thickness
         
-    def control(self):
-        # Get the current state as a vector
-        state = self.get_state_vector()
-        # Get action from DQNAI model
-        thrust, angle_change, thrust_idx, angle_idx = self.ai_model.act(state)
+    def control(self, state=None):
+        # Get the current state as a vector (unless already computed by the caller)
+        if state is None:
+            state = self.get_state_vector()
+        # Get action from DQNAI model (or from the frozen policy)
+        agent = self.ai_model if self.policy is None else self.policy
+        thrust, angle_change, thrust_idx, angle_idx = agent.act(state)
         # Apply the actions to the lander
-        self.lander.pilot_commands(thrust=thrust, angle=self.lander.angle + angle_change)
+        self.held_thrust, self.held_angle = thrust, self.lander.angle + angle_change
+        self.hold()
         return thrust, angle_change, thrust_idx, angle_idx
 
+    def hold(self):
+        # Apply the last chosen commands again (between decision points when actions are repeated)
+        self.lander.pilot_commands(thrust=self.held_thrust, angle=self.held_angle)
+
     def estimate_initial_fuel(self):
         """
         Estimate and set the initial fuel quantity based on planet characteristics.
@@ -75,46 +132,32 @@ class BasicAI:
         self.lander.adjust_fuel(fuel_estimate)
     
     def get_state_vector(self):
-        # Convert lander state to a vector
-        state = self.lander.get_state()
-        position = state['position']
-        velocity = state['velocity']
-        angle = [state['angle']]
-        fuel = [state['fuel']]
-    
-        # Distance to landing zone
-        if abs(position[0] - self.landing_x_center) < abs(position[0] + self.planet.ground_length - self.landing_x_center) :    
-            dx = [position[0] - self.landing_x_center]
-        else:
-            dx = [position[0] + self.planet.ground_length - self.landing_x_center]
-        dy = [position[1] - self.landing_y_center]
-    
+        """
+        Current state vector (float32, ready for torch.from_numpy).
+        The static block (planet and lander properties) is written once per episode by prepare_for_landing,
+        only the dynamic entries are computed here, in place. The vector is one of two alternating buffers:
+        it stays valid until the next-but-one call (copy it to keep it longer).
+        """
+        self.observation_index ^= 1
+        out = self.observations[self.observation_index]
+        lander = self.lander
+        x, y = lander.position
+        vx, vy = lander.velocity
+
+        # Distance to landing zone (the shortest way around the planet)
+        dx = x - self.landing_x_center
+        dx_wrapped = dx + self.planet.ground_length
+        if abs(dx_wrapped) <= abs(dx):
+            dx = dx_wrapped
+
+        # Normalized dynamic state data (same values as normalize() over the ranges of dynamic_state_features)
+        out[9] = dx * self.dx_scale
+        out[10] = (y - self.landing_y_center) * self.dy_scale
+        out[11] = (vx + 500) * 0.001
+        out[12] = (vy + 500) * 0.001
+        out[13] = lander.angle / 180
+        out[14] = lander.fuel * 0.01
+
         # Terrain sensing
-        terrain_info = self.lander.sense_terrain(self.planet)
-    
-        # Planet properties (normalized)
-        p1 = [normalize(self.planet.radius, 1000, 10000)]  # Normalize radius (example range: 1000 to 10000)
-        p2 = [normalize(self.planet.atmosphere_thickness, 500, 1500)]  # Normalize atmosphere thickness
-        p3 = [normalize(self.planet.air_ground_density, 0.5, 3.0)]  # Normalize air density
-        p4 = [normalize(self.planet.gravity_constant, 1, 20)]  # Normalize gravity constant
-    
-        # Lander properties (normalized)
-        l1 = [normalize(self.lander.max_thrust, 500, 5000)]  # Normalize max thrust
-        l2 = [normalize(self.lander.max_fuel, 100, 1000)]  # Normalize max fuel
-        l3 = [normalize(self.lander.drag_coeff, 0.2, 0.8)]  # Normalize drag coefficient
-        l4 = [normalize(self.lander.surface_area, 1, 10)]  # Normalize surface area
-        l5 = [normalize(self.lander.mass, 52.5, 525)]  # Normalize mass
-    
-        # Normalize dynamic state data
-        dx = [(normalize(dx[0], -self.planet.ground_length / 2, self.planet.ground_length / 2)-0.5)*2]
-        dy = [(normalize(dy[0], -self.planet.atmosphere_thickness, self.planet.atmosphere_thickness)-0.5)*2]  # Normalize height (example: max 2000 meters)
-        velocity = [normalize(v, -500, 500) for v in velocity]  # Normalize velocities
-        angle = [(normalize(angle[0], -180, 180)-0.5)*2]  # Normalize angle (-180 to 180 degrees)
-        fuel = [normalize(fuel[0], 0, 100)]  # Normalize fuel
-    
-        # Combine all state information
-        state_vector = np.concatenate([p1, p2, p3, p4,
-                                       l1, l2, l3, l4, l5,
-                                       dx, dy, velocity, angle, fuel, terrain_info])
-        return state_vector
-    
+        out[15:] = lander.sense_terrain(self.planet, num_rays=self.num_rays)
+        return out
@@ -5,11 +5,15 @@
 import torch
 import torch.nn as nn
 import torch.optim as optim
+import copy
 import random
 import numpy as np
 
+from ai_models.replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
+
 class DQNAI:
-    def __init__(self, lander, planet, state_size, action_size, max_memory_size=10000):
+    def __init__(self, lander, planet, state_size, action_size, max_memory_size=10000,
+                 target_update_interval=1000, double_dqn=False, loss='mse', prioritized=False):
         self.lander = lander
         self.planet = planet
         self.state_size = state_size
@@ -17,19 +21,29 @@ class DQNAI:
         self.angle_bins = np.linspace(-15, 15, 5)  # 5 discrete angle changes (-15 to 15 degrees)
 
         self.action_size = len(self.thrust_bins) * len(self.angle_bins)  # Total number of discrete actions
-        self.memory = []  # Replay memory
         self.max_memory_size = max_memory_size
+        self.prioritized = prioritized  # Prioritized experience replay instead of uniform sampling
+        if prioritized:
+            self.memory = PrioritizedReplayBuffer(max_memory_size, state_size)  # Replay memory
+        else:
+            self.memory = ReplayBuffer(max_memory_size, state_size)  # Replay memory
         self.gamma = 0.95  # Discount factor
         self.epsilon = 1.0  # Exploration rate
         self.epsilon_min = 0.05
         self.epsilon_decay = 0.99995
         self.learning_rate = 0.0001
         self.batch_size = 128
+        self.target_update_interval = target_update_interval  # Gradient steps between target network syncs
+        self.double_dqn = double_dqn  # Select next actions with the online network, evaluate them with the target one
+        self.train_steps = 0  # Number of gradient steps done
 
-        # Neural network model
+        # Neural network model, and a periodically synced copy used to compute the targets
         self.model = self._build_model()
+        self.target_model = self._build_model()
+        self.sync_target()
         self.optimizer = optim.Adam(self.model.parameters(), lr=self.learning_rate)
-        self.loss_fn = nn.MSELoss()
+        # Element-wise loss, reduced in learn() (weighted by the importance-sampling weights if any)
+        self.loss_fn = nn.SmoothL1Loss(reduction='none') if loss == 'huber' else nn.MSELoss(reduction='none')
 
     def _build_model(self):
         model = nn.Sequential(
@@ -49,10 +63,9 @@ class DQNAI:
         return model
 
     def remember(self, state, action, reward, next_state, done):
-        # Save experience to replay memory
-        if len(self.memory) >= self.max_memory_size:
-            self.memory.pop(0)
-        self.memory.append((state, action, reward, next_state, done))
+        # Save experience to replay memory (the oldest one is overwritten when full)
+        action_idx = action[0] * len(self.angle_bins) + action[1]  # Flattened action index
+        self.memory.add(state, action_idx, reward, next_state, done)
 
     def act(self, state):
         # Epsilon-greedy action selection
@@ -62,7 +75,7 @@ class DQNAI:
             angle_idx = random.randint(0, len(self.angle_bins) - 1)
         else:
             # Exploit: select the best action based on predicted Q-values
-            state_tensor = torch.FloatTensor(state).unsqueeze(0)
+            state_tensor = torch.as_tensor(state, dtype=torch.float32).unsqueeze(0)  # No copy for float32 states
             with torch.no_grad():
                 action_values = self.model(state_tensor).cpu().numpy()[0]
             
@@ -78,49 +91,89 @@ class DQNAI:
         return thrust, angle_change, thrust_idx, angle_idx
 
 
+    def sync_target(self):
+        # Copy the online network weights into the target network
+        self.target_model.load_state_dict(self.model.state_dict())
+        self.target_model.eval()
+
     def replay(self):
         if len(self.memory) < self.batch_size:
             return
-        minibatch = random.sample(self.memory, self.batch_size)
-    
-        states = []
-        targets = []
-    
-        for state, action, reward, next_state, done in minibatch:
-            state_tensor = torch.FloatTensor(state)
-            next_state_tensor = torch.FloatTensor(next_state)
-            action_idx = action[0] * len(self.angle_bins) + action[1]  # Flattened action index
-            
-            target = reward
-            if not done:
-                with torch.no_grad():
-                    target = reward + self.gamma * torch.max(self.model(next_state_tensor)).item()
+        if self.prioritized:
+            states, actions, rewards, next_states, dones, weights, indices = self.memory.sample(self.batch_size)
+            td_errors = self.learn(states, actions, rewards, next_states, dones, weights)
+            self.memory.update_priorities(indices, td_errors)
+        else:
+            states, actions, rewards, next_states, dones = self.memory.sample(self.batch_size)
+            td_errors = self.learn(states, actions, rewards, next_states, dones)
+        return td_errors
+
+    def learn(self, states, actions, rewards, next_states, dones, weights=None):
+        """
+        One batched gradient step on a minibatch of transitions (tensors).
+        weights: optional importance-sampling weight of each transition in the loss.
+        Returns the TD errors of the minibatch (numpy array).
+        """
+        # Targets: r + gamma * max_a' Q_target(s', a') for non-terminal transitions
+        with torch.no_grad():
+            next_q_values = self.target_model(next_states)
+            if self.double_dqn:
+                self.model.eval()
+                next_actions = self.model(next_states).argmax(dim=1, keepdim=True)
+                self.model.train()
+                next_values = next_q_values.gather(1, next_actions).squeeze(1)
+            else:
+                next_values = next_q_values.max(dim=1).values
+            targets = rewards + self.gamma * (1 - dones) * next_values
+
+        # Q-values of the actions taken
+        q_values = self.model(states).gather(1, actions.unsqueeze(1)).squeeze(1)
+        losses = self.loss_fn(q_values, targets)
+        loss = losses.mean() if weights is None else (losses * weights).mean()
 
-            target_f = self.model(state_tensor).detach().numpy()
-            
-            # Update the Q-value for the chosen action
-            target_f[action_idx] = target
-    
-            states.append(state_tensor)
-            targets.append(torch.FloatTensor(target_f))
-    
-        states = torch.stack(states)
-        targets = torch.stack(targets)
-    
         self.optimizer.zero_grad()
-        outputs = self.model(states)
-        loss = self.loss_fn(outputs, targets)
         loss.backward()
         self.optimizer.step()
-    
+
+        self.train_steps += 1
+        if self.train_steps % self.target_update_interval == 0:
+            self.sync_target()
+
         if self.epsilon > self.epsilon_min:
             self.epsilon *= self.epsilon_decay
+        return (targets - q_values).detach().numpy()
 
 
     def save(self, filepath):
         # Save the model parameters
         torch.save(self.model.state_dict(), filepath)
 
+    def export_policy(self, filepath=None):
+        # Freeze the current network into a NumPy-only greedy policy (saved as .npz if a path is given)
+        from ai_models.numpy_policy import NumpyPolicy
+        policy = NumpyPolicy.from_model(self.model, self.thrust_bins, self.angle_bins)
+        if filepath is not None:
+            policy.save(filepath)
+        return policy
+
+    def training_state(self):
+        # Copy of everything needed to resume training (except the replay memory)
+        return {'model': {k: v.detach().clone() for k, v in self.model.state_dict().items()},
+                'target_model': {k: v.detach().clone() for k, v in self.target_model.state_dict().items()},
+                'optimizer': copy.deepcopy(self.optimizer.state_dict()),
+                'epsilon': self.epsilon,
+                'train_steps': self.train_steps}
+
+    def load_training_state(self, state):
+        # Restore a state returned by training_state
+        self.model.load_state_dict(state['model'])
+        self.target_model.load_state_dict(state['target_model'])
+        self.target_model.eval()
+        self.optimizer.load_state_dict(state['optimizer'])
+        self.epsilon = state['epsilon']
+        self.train_steps = state['train_steps']
+
     def load(self, filepath):
         # Load the model parameters
         self.model.load_state_dict(torch.load(filepath))
+        self.sync_target()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+# ai_models/numpy_policy.py
+
+import os
+import re
+import numpy as np
+
+
+class NumpyPolicy:
+    """
+    Greedy DQN policy evaluated with NumPy only.
+    Holds a frozen copy of the DQNAI network (Linear, ReLU and LayerNorm layers; Dropout is the identity
+    at inference), so a trained policy can be loaded and run without importing torch.
+    Exported with DQNAI.export_policy / NumpyPolicy.save, loaded with NumpyPolicy.load (.npz files).
+    """
+    def __init__(self, layers, thrust_bins, angle_bins):
+        # layers: list of ('linear', weight (in, out), bias), ('relu',) or ('layernorm', weight, bias, eps)
+        self.layers = layers
+        self.thrust_bins = np.asarray(thrust_bins, dtype=float)
+        self.angle_bins = np.asarray(angle_bins, dtype=float)
+        self._ops = _fold_layers(layers)
+
+    @classmethod
+    def from_model(cls, model, thrust_bins, angle_bins):
+        """Freeze the weights of a torch nn.Sequential network (as built by DQNAI)."""
+        layers = []
+        for module in model:
+            kind = type(module).__name__
+            if kind == 'Linear':
+                layers.append(('linear', _to_numpy(module.weight).T.copy(), _to_numpy(module.bias)))
+            elif kind == 'ReLU':
+                layers.append(('relu',))
+            elif kind == 'LayerNorm':
+                layers.append(('layernorm', _to_numpy(module.weight), _to_numpy(module.bias), float(module.eps)))
+            elif kind != 'Dropout':  # Dropout does nothing at inference
+                raise ValueError(f"Layer {kind} is not supported by NumpyPolicy")
+        return cls(layers, thrust_bins, angle_bins)
+
+    def save(self, filepath):
+        arrays = {'kinds': np.array([layer[0] for layer in self.layers]),
+                  'thrust_bins': self.thrust_bins, 'angle_bins': self.angle_bins}
+        for i, layer in enumerate(self.layers):
+            for j, value in enumerate(layer[1:]):
+                arrays[f'{i}.{j}'] = np.asarray(value)
+        np.savez(filepath, **arrays)
+
+    @classmethod
+    def load(cls, filepath):
+        with np.load(filepath) as data:
+            layers = []
+            for i, kind in enumerate(data['kinds']):
+                kind = str(kind)
+                if kind == 'linear':
+                    layers.append((kind, data[f'{i}.0'], data[f'{i}.1']))
+                elif kind == 'layernorm':
+                    layers.append((kind, data[f'{i}.0'], data[f'{i}.1'], float(data[f'{i}.2'])))
+                else:
+                    layers.append((kind,))
+            return cls(layers, data['thrust_bins'], data['angle_bins'])
+
+    def q_values(self, states):
+        """Q-values of a state (shape (state_size,)) or of a batch of states (shape (n, state_size))."""
+        x = np.asarray(states, dtype=float)
+        single = x.ndim == 1
+        for op in self._ops:
+            if op[0] == 'linear':
+                x = x @ op[1]
+                x += op[2]
+            elif op[0] == 'relu':
+                np.maximum(x, 0, out=x)
+            elif single:
+                # Normalization of one vector (dot products are much cheaper than mean() on small arrays)
+                n = len(x)
+                x -= x.sum() / n
+                x *= 1.0 / np.sqrt(np.dot(x, x) / n + op[1])
+            else:
+                x -= x.mean(axis=-1, keepdims=True)
+                x /= np.sqrt((x * x).mean(axis=-1, keepdims=True) + op[1])
+        return x
+
+    def act(self, state):
+        """Greedy action for one state, returned like DQNAI.act: (thrust, angle_change, thrust_idx, angle_idx)."""
+        action_idx = int(np.argmax(self.q_values(state)))
+        thrust_idx, angle_idx = divmod(action_idx, len(self.angle_bins))
+        return self.thrust_bins[thrust_idx], self.angle_bins[angle_idx], thrust_idx, angle_idx
+
+    def act_batch(self, states):
+        """Greedy flat action indices (thrust_idx * len(angle_bins) + angle_idx) for a batch of states."""
+        return np.argmax(self.q_values(states), axis=-1)
+
+
+def get_latest_policy(save_dir):
+    """Find the latest exported policy (ai_model_episode_<n>.npz) in the specified directory."""
+    if not os.path.isdir(save_dir):
+        return None
+    files = [f for f in os.listdir(save_dir) if re.match(r'ai_model_episode_\d+\.npz', f)]
+    if not files:
+        return None
+    latest_policy = max(files, key=lambda x: int(re.search(r'\d+', x).group()))
+    return os.path.join(save_dir, latest_policy)
+
+
+def _fold_layers(layers):
+    """
+    Inference program of the layers: the affine part of each LayerNorm is folded into the Linear layer
+    that follows it (x * w + b) @ W + c = x @ (w[:, None] * W) + (b @ W + c), leaving a plain normalization.
+    """
+    ops = []
+    pending = None  # LayerNorm affine (weight, bias) not folded yet
+    for layer in layers:
+        if layer[0] == 'linear':
+            weight, bias = layer[1], layer[2]
+            if pending is not None:
+                weight, bias = pending[0][:, None] * weight, pending[1] @ weight + bias
+                pending = None
+            ops.append(('linear', np.ascontiguousarray(weight), bias))
+        else:
+            if pending is not None:  # Nothing to fold into: apply the affine as is
+                ops.append(('linear', np.diag(pending[0]), pending[1]))
+                pending = None
+            if layer[0] == 'layernorm':
+                ops.append(('normalize', layer[3]))
+                pending = (layer[1], layer[2])
+            else:
+                ops.append(layer)
+    if pending is not None:
+        ops.append(('linear', np.diag(pending[0]), pending[1]))
+    return ops
+
+
+def _to_numpy(parameter):
+    return parameter.detach().cpu().numpy().astype(float)
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+# ai_models/replay_buffer.py
+
+import numpy as np
+import torch
+
+
+class ReplayBuffer:
+    """
+    Replay memory backed by preallocated arrays used as a ring buffer.
+    Inserting overwrites the oldest transition once the buffer is full (O(1) insert and eviction).
+    States are stored as float32, actions as flat action indices (int64, ready for gather).
+    """
+    def __init__(self, capacity, state_size):
+        self.capacity = capacity
+        self.state_size = state_size
+        self.states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=np.float32)
+        self.position = 0  # Next slot to write
+        self.size = 0
+        self.total_added = 0  # Transitions added since creation (overwritten ones included)
+        self._batch = None  # Preallocated minibatch arrays (see sample)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, next_state, done):
+        """Store one transition, evicting the oldest one if the buffer is full."""
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.total_added += 1
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        """Store a batch of transitions at once, returns the slots they were written to."""
+        indices = (self.position + np.arange(len(rewards))) % self.capacity
+        self.states[indices] = states
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.next_states[indices] = next_states
+        self.dones[indices] = dones
+        self.position = (self.position + len(rewards)) % self.capacity
+        self.size = min(self.size + len(rewards), self.capacity)
+        self.total_added += len(rewards)
+        return indices
+
+    def transitions(self):
+        """Views of the stored transitions (states, actions, rewards, next_states, dones), in slot order."""
+        n = self.size
+        return (self.states[:n], self.actions[:n], self.rewards[:n], self.next_states[:n], self.dones[:n])
+
+    def clear(self):
+        """Forget all stored transitions (the arrays are kept)."""
+        self.position = 0
+        self.size = 0
+
+    def state_dict(self):
+        """Copy of the stored transitions and ring position (e.g. for checkpoints)."""
+        n = self.size
+        return {'states': self.states[:n].copy(), 'actions': self.actions[:n].copy(),
+                'rewards': self.rewards[:n].copy(), 'next_states': self.next_states[:n].copy(),
+                'dones': self.dones[:n].copy(), 'position': self.position}
+
+    def load_state_dict(self, state):
+        """Restore transitions saved by state_dict (the capacity must be large enough)."""
+        n = len(state['rewards'])
+        if n > self.capacity:
+            raise ValueError(f"Cannot load {n} transitions in a replay buffer of capacity {self.capacity}")
+        self.states[:n] = state['states']
+        self.actions[:n] = state['actions']
+        self.rewards[:n] = state['rewards']
+        self.next_states[:n] = state['next_states']
+        self.dones[:n] = state['dones']
+        self.size = n
+        self.position = int(state['position']) % self.capacity
+
+    def sample_indices(self, batch_size):
+        """Uniformly drawn indices of stored transitions (with replacement)."""
+        return np.random.randint(0, self.size, size=batch_size)
+
+    def sample(self, batch_size):
+        """
+        Sample a minibatch of transitions.
+        Returns torch tensors (states, actions, rewards, next_states, dones) sharing memory with
+        minibatch arrays owned by the buffer: they are overwritten by the next call to sample/gather.
+        """
+        return self.gather(self.sample_indices(batch_size))
+
+    def gather(self, indices):
+        """Copy the transitions at the given indices into the minibatch arrays and return them as tensors."""
+        batch_size = len(indices)
+        if self._batch is None or len(self._batch[0]) != batch_size:
+            self._batch = (np.empty((batch_size, self.state_size), dtype=np.float32),
+                           np.empty(batch_size, dtype=np.int64),
+                           np.empty(batch_size, dtype=np.float32),
+                           np.empty((batch_size, self.state_size), dtype=np.float32),
+                           np.empty(batch_size, dtype=np.float32))
+        columns = (self.states, self.actions, self.rewards, self.next_states, self.dones)
+        for column, out in zip(columns, self._batch):
+            np.take(column, indices, axis=0, out=out)
+        return tuple(torch.from_numpy(out) for out in self._batch)
+
+
+class SumTree:
+    """
+    Binary sum-tree stored in a flat array: leaf i holds the priority of slot i,
+    every internal node the sum of its two children (node 1 is the root, node n has children 2n and 2n+1).
+    Prefix-sum search and priority updates are O(log n), and both are vectorized over many values.
+    """
+    def __init__(self, capacity):
+        self.leaf_offset = 1 << max(0, (capacity - 1).bit_length())  # First leaf node (power of two)
+        self.depth = self.leaf_offset.bit_length() - 1
+        self.tree = np.zeros(2 * self.leaf_offset)
+        self._ancestor_shifts = np.arange(1, self.depth + 1)
+
+    def total(self):
+        return self.tree[1]
+
+    def get(self, indices):
+        """Priorities stored at the given slots."""
+        return self.tree[np.asarray(indices) + self.leaf_offset]
+
+    def set(self, index, priority):
+        """Set the priority of one slot (adds the change to all its ancestors)."""
+        node = index + self.leaf_offset
+        change = priority - self.tree[node]
+        self.tree[node] = priority
+        self.tree[node >> self._ancestor_shifts] += change
+
+    def update(self, indices, priorities):
+        """Set the priorities of many slots, then recompute the sums along their paths to the root."""
+        nodes = np.asarray(indices) + self.leaf_offset
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes >> 1)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values):
+        """Slots whose cumulative priority range contains each value (values in [0, total))."""
+        nodes = np.ones(len(values), dtype=np.intp)
+        values = np.array(values, dtype=float)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sums = self.tree[left]
+            go_right = values >= left_sums
+            values -= left_sums * go_right
+            nodes = left + go_right
+        return nodes - self.leaf_offset
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Replay buffer sampling transitions proportionally to priority**alpha (prioritized experience replay).
+    New transitions get the highest priority seen so far; priorities are then updated from the TD errors.
+    sample also returns the importance-sampling weights (annealed from beta to 1) and the sampled indices.
+    """
+    def __init__(self, capacity, state_size, alpha=0.6, beta=0.4, beta_increment=1e-5, epsilon=1e-3):
+        super().__init__(capacity, state_size)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment  # Annealing of beta towards 1, per sampled minibatch
+        self.epsilon = epsilon  # Keeps zero-error transitions sampleable
+        self.max_priority = 1.0
+        self.tree = SumTree(capacity)
+
+    def add(self, state, action, reward, next_state, done):
+        index = self.position
+        super().add(state, action, reward, next_state, done)
+        self.tree.set(index, self.max_priority ** self.alpha)
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        indices = super().add_batch(states, actions, rewards, next_states, dones)
+        self.tree.update(indices, np.full(len(indices), self.max_priority ** self.alpha))
+        return indices
+
+    def clear(self):
+        super().clear()
+        self.tree.tree[:] = 0
+
+    def state_dict(self):
+        state = super().state_dict()
+        state['priorities'] = self.tree.get(np.arange(self.size))
+        state['max_priority'] = self.max_priority
+        state['beta'] = self.beta
+        return state
+
+    def load_state_dict(self, state):
+        super().load_state_dict(state)
+        self.tree.tree[:] = 0
+        self.tree.update(np.arange(self.size), state['priorities'])
+        self.max_priority = float(state['max_priority'])
+        self.beta = float(state['beta'])
+
+    def sample_indices(self, batch_size):
+        """Stratified proportional sampling: one index per equal slice of the total priority."""
+        segment = self.tree.total() / batch_size
+        values = (np.arange(batch_size) + np.random.rand(batch_size)) * segment
+        return np.minimum(self.tree.find(values), self.size - 1)
+
+    def sample(self, batch_size):
+        """
+        Sample a prioritized minibatch.
+        Returns (states, actions, rewards, next_states, dones, weights, indices): tensors as in
+        ReplayBuffer.sample, the normalized importance-sampling weights tensor and the index array.
+        """
+        indices = self.sample_indices(batch_size)
+        probabilities = self.tree.get(indices) / self.tree.total()
+        weights = (self.size * probabilities) ** -self.beta
+        weights /= weights.max()
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        weights = torch.from_numpy(weights.astype(np.float32))
+        return self.gather(indices) + (weights, indices)
+
+    def update_priorities(self, indices, td_errors):
+        """Set the priorities of sampled transitions from their absolute TD errors."""
+        priorities = np.abs(td_errors) + self.epsilon
+        self.max_priority = max(self.max_priority, priorities.max())
+        self.tree.update(indices, priorities ** self.alpha)
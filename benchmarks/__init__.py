@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+# Throughput benchmarks of the hot paths
+# Makes this folder a package
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+# Throughput benchmarks of the hot paths
+
+# benchmarks/run_benchmarks.py
+#
+# Usage:
+#   python -m benchmarks.run_benchmarks                      # run all, save benchmarks/results.json
+#   python -m benchmarks.run_benchmarks --save-baseline      # also store the results as the baseline
+#   python -m benchmarks.run_benchmarks --only ray_casts ... # run some benchmarks only
+# Results are compared with the baseline (benchmarks/baseline.json) when there is one: a benchmark slower
+# than baseline * (1 - threshold) is reported as a regression and the exit code is 1.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+from ai_models.basic_ai import BasicAI
+from ai_models.replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
+from environments.batch_physics import LanderBatch, update_landers
+from environments.physics import LanderStepper
+from environments.scenarios import random_scenario
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SEED = 1234
+BATCH_SIZE = 1024  # Landers / queries of the batched benchmarks
+
+
+def measure(run, ops_per_run, min_time=0.5, repeats=3):
+    """
+    Operations per second of run() (which does ops_per_run operations): best of `repeats` timings,
+    each one calling run() as many times as needed to last at least min_time seconds.
+    """
+    best = 0.0
+    for _ in range(repeats):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            run()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, calls * ops_per_run / elapsed)
+    return best
+
+
+def seed_everything(seed=SEED):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def scenario(seed=SEED):
+    """Fixed planet, lander and start position (the lander is reset, flying)."""
+    return random_scenario(np.random.default_rng(seed))
+
+
+def scenario_batch(size=BATCH_SIZE, seed=SEED):
+    """Landers (and their start positions) of different scenarios flying over the same planet."""
+    planet, _, _ = scenario(seed)
+    scenarios = [scenario(seed + 1 + i) for i in range(size)]
+    return planet, [lander for _, lander, _ in scenarios], [start for _, _, start in scenarios]
+
+
+def bench_physics_steps():
+    planet, lander, start_position = scenario()
+    stepper = LanderStepper(lander, planet)
+
+    def run():
+        lander.reset(start_position)
+        for _ in range(100):
+            stepper.step(0.1)
+    results = {'physics_steps': measure(run, 100)}
+
+    planet, landers, start_positions = scenario_batch()
+    batch = LanderBatch.from_landers(landers)
+
+    def run_batch():
+        batch.reset(start_positions)
+        for _ in range(10):
+            update_landers(batch, planet, 0.1)
+    results['physics_steps_batched'] = measure(run_batch, 10 * BATCH_SIZE)
+    return results
+
+
+def bench_terrain_heights():
+    planet, _, _ = scenario()
+    index = planet.terrain_index
+    xs = np.random.default_rng(SEED).uniform(0, planet.ground_length, 100000)
+    scalar_xs = xs[:1000].tolist()
+
+    def run():
+        for x in scalar_xs:
+            index.height_at(x)
+    return {'terrain_heights': measure(run, len(scalar_xs)),
+            'terrain_heights_batched': measure(lambda: index.heights_at(xs), len(xs))}
+
+
+def bench_ray_casts():
+    planet, lander, _ = scenario()
+    num_rays = 5
+    results = {'ray_casts': measure(lambda: lander.sense_terrain(planet, num_rays=num_rays), num_rays)}
+    planet, landers, _ = scenario_batch()
+    batch = LanderBatch.from_landers(landers)
+    results['ray_casts_batched'] = measure(lambda: batch.sense_terrain(planet, num_rays=num_rays), num_rays * BATCH_SIZE)
+    return results
+
+
+def bench_state_vectors():
+    seed_everything()
+    planet, lander, _ = scenario()
+    ai_model = BasicAI(lander, planet)
+    return {'state_vectors': measure(ai_model.get_state_vector, 1)}
+
+
+def bench_replay():
+    rng = np.random.default_rng(SEED)
+    state_size, capacity = 20, 10000
+    states = rng.random((capacity, state_size), dtype=np.float32)
+    results = {}
+    for name, buffer_class in (('replay', ReplayBuffer), ('prioritized_replay', PrioritizedReplayBuffer)):
+        np.random.seed(SEED)
+        memory = buffer_class(capacity, state_size)
+
+        def run_insert():
+            for i in range(1000):
+                memory.add(states[i], i % 25, 1.0, states[i + 1], 0.0)
+        results[f'{name}_inserts'] = measure(run_insert, 1000)
+        results[f'{name}_samples'] = measure(lambda: memory.sample(128), 128)
+    return results
+
+
+def bench_learner_updates():
+    seed_everything()
+    planet, lander, _ = scenario()
+    dqn = BasicAI(lander, planet).ai_model
+    rng = np.random.default_rng(SEED)
+    n = dqn.memory.capacity
+    dqn.memory.add_batch(rng.random((n, dqn.state_size)), rng.integers(0, dqn.action_size, n),
+                         rng.normal(size=n), rng.random((n, dqn.state_size)), rng.random(n) < 0.01)
+    return {'learner_updates': measure(dqn.replay, 1, repeats=2)}
+
+
+def bench_episodes():
+    from training.ai_trainer import train_ai_model
+    num_episodes = 3
+
+    def run():
+        seed_everything()
+        with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()):
+            train_ai_model(num_episodes=num_episodes, save_interval=num_episodes, reset_model=True,
+                           save_dir=os.path.join(directory, 'models'), loss_file=os.path.join(directory, 'loss.csv'),
+                           metrics_dir=os.path.join(directory, 'metrics'))
+    return {'episodes': measure(run, num_episodes, min_time=0, repeats=1)}
+
+
+BENCHMARKS = {
+    'physics_steps': bench_physics_steps,
+    'terrain_heights': bench_terrain_heights,
+    'ray_casts': bench_ray_casts,
+    'state_vectors': bench_state_vectors,
+    'replay': bench_replay,
+    'learner_updates': bench_learner_updates,
+    'episodes': bench_episodes,
+}
+
+
+def run_benchmarks(names=None):
+    """Run the selected benchmarks, returns {measurement: operations per second}."""
+    torch.set_num_threads(1)  # Comparable results from one machine load to the other
+    results = {}
+    for name in names or BENCHMARKS:
+        results.update(BENCHMARKS[name]())
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Regressions: measurements slower than baseline * (1 - threshold), as {name: (result, baseline)}."""
+    return {name: (value, baseline[name]) for name, value in results.items()
+            if name in baseline and value < baseline[name] * (1 - threshold)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput benchmarks of the lander simulation and training")
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help="Benchmarks to run (default: all)")
+    parser.add_argument('--output', default=os.path.join(BENCHMARK_DIR, 'results.json'), help="Results file")
+    parser.add_argument('--baseline', default=os.path.join(BENCHMARK_DIR, 'baseline.json'), help="Baseline file")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Relative slowdown reported as a regression")
+    parser.add_argument('--save-baseline', action='store_true', help="Store the results as the new baseline")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.only)
+    report = {'results': results,
+              'machine': {'python': platform.python_version(), 'numpy': np.__version__, 'torch': torch.__version__,
+                          'platform': platform.platform(), 'processor': platform.processor()},
+              'time': time.time()}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=1)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    print(f"{'benchmark':<34}{'ops/s':>14}{'baseline':>14}{'change':>9}")
+    for name, value in results.items():
+        if name in baseline:
+            print(f"{name:<34}{value:>14.4g}{baseline[name]:>14.4g}{100 * (value / baseline[name] - 1):>+8.1f}%")
+        else:
+            print(f"{name:<34}{value:>14.4g}{'-':>14}{'':>9}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=1)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, (value, reference) in regressions.items():
+        print(f"REGRESSION {name}: {value:.4g} ops/s < {reference:.4g} * (1 - {args.threshold})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
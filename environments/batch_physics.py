@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+# Contains planet environments and simulations
+# Batched physics calculations for many landers at once
+
+# environments/batch_physics.py
+
+import numpy as np
+
+from environments.physics import MAX_HORIZONTAL_LANDING_SPEED, MAX_VERTICAL_LANDING_SPEED
+from environments.terrain import ray_angles
+
+
+def atmosphere_density_array(altitude, atmosphere_thickness, air_ground_density):
+    """Vectorized Planet.atmosphere_density: works on arrays of altitudes (and planet parameters)."""
+    density = (1 - altitude / atmosphere_thickness) * air_ground_density
+    density = np.where(altitude >= atmosphere_thickness, 0.0, density)
+    return np.where(altitude <= 0, air_ground_density, density)
+
+
+class LanderBatch:
+    """
+    Struct-of-arrays state for a batch of landers.
+    Every lander attribute used by the physics lives in its own contiguous float64 array,
+    so a whole batch is advanced by a handful of NumPy operations (see update_landers).
+    """
+    def __init__(self, size):
+        self.size = size
+        # Dynamic state
+        self.x = np.zeros(size)
+        self.y = np.zeros(size)
+        self.vx = np.zeros(size)
+        self.vy = np.zeros(size)
+        self.angle = np.zeros(size)  # Orientation (degrees)
+        self.thrust = np.zeros(size)  # 0-1 of max_thrust
+        self.fuel = np.full(size, 100.0)
+        self.is_landed = np.zeros(size, dtype=bool)
+        self.crashed = np.zeros(size, dtype=bool)
+        # Lander properties
+        self.max_thrust = np.zeros(size)
+        self.max_fuel = np.ones(size)
+        self.drag_coeff = np.zeros(size)
+        self.mass = np.ones(size)
+        self.surface_area = np.zeros(size)
+        # Per-lander constants derived from the properties (see update_constants)
+        self.half_drag_area = np.zeros(size)
+        self.inv_mass = np.ones(size)
+        self.fuel_rate = np.zeros(size)
+
+    @classmethod
+    def from_landers(cls, landers):
+        """Build a batch holding a copy of the state and properties of the given Lander objects."""
+        batch = cls(len(landers))
+        for i, lander in enumerate(landers):
+            batch.set_lander(i, lander)
+        batch.update_constants()
+        return batch
+
+    def set_lander(self, i, lander):
+        """Copy a Lander object into slot i (call update_constants afterwards)."""
+        self.x[i], self.y[i] = lander.position
+        self.vx[i], self.vy[i] = lander.velocity
+        self.angle[i] = lander.angle
+        self.thrust[i] = lander.thrust
+        self.fuel[i] = lander.fuel
+        self.is_landed[i] = lander.is_landed
+        self.crashed[i] = lander.crashed
+        self.max_thrust[i] = lander.max_thrust
+        self.max_fuel[i] = lander.max_fuel
+        self.drag_coeff[i] = lander.drag_coeff
+        self.mass[i] = lander.mass
+        self.surface_area[i] = lander.surface_area
+
+    def write_back(self, i, lander):
+        """Copy the dynamic state of slot i back into a Lander object."""
+        lander.position = np.array([self.x[i], self.y[i]])
+        lander.velocity = np.array([self.vx[i], self.vy[i]])
+        lander.angle = float(self.angle[i])
+        lander.thrust = float(self.thrust[i])
+        lander.fuel = float(self.fuel[i])
+        lander.is_landed = bool(self.is_landed[i])
+        lander.crashed = bool(self.crashed[i])
+
+    def update_constants(self):
+        """Precompute the per-lander constants used by update_landers."""
+        self.half_drag_area = 0.5 * self.drag_coeff * self.surface_area
+        self.inv_mass = 1.0 / self.mass
+        self.fuel_rate = self.max_thrust / self.max_fuel
+
+    def reset(self, start_positions, index=None):
+        """
+        Reset landers to their initial conditions, like Lander.reset.
+        - start_positions: array of shape (n, 5) with rows (x, y, v, t, a).
+        - index: slots to reset (all landers if None).
+        """
+        index = slice(None) if index is None else index
+        x, y, v, t, a = np.asarray(start_positions, dtype=float).T
+        self.x[index] = x
+        self.y[index] = y
+        self.vx[index] = v * np.sin(a * 3.14 / 180)
+        self.vy[index] = -v * np.cos(a * 3.14 / 180)
+        self.angle[index] = a
+        self.fuel[index] = 100.0
+        self.thrust[index] = t
+        self.is_landed[index] = False
+        self.crashed[index] = False
+
+    def pilot_commands(self, thrust, angle):
+        """Batched Lander.pilot_commands: rate-limited thrust (0-1) and angle (degrees) commands for every lander."""
+        self.thrust = np.clip(self.thrust + np.clip(thrust - self.thrust, -0.2, 0.2), 0.0, 1.0)
+        self.thrust[self.fuel <= 0] = 0
+        self.angle = np.clip(self.angle + np.clip(angle - self.angle, -15, 15), 0, 100)
+
+    def sense_terrain(self, planet, num_rays=5, max_distance=1000, spread=np.pi):
+        """
+        Batched Lander.sense_terrain: ray-cast distances to the terrain for every lander.
+        Returns an array of shape (size, num_rays).
+        """
+        angles = ray_angles(num_rays, spread) + np.radians(self.angle)[:, None]
+        return planet.terrain_index.cast_rays(self.x[:, None], self.y[:, None], angles, max_distance)
+
+    @property
+    def active(self):
+        """Mask of landers still flying."""
+        return ~(self.is_landed | self.crashed)
+
+
+def update_landers(batch, planet, dt):
+    """
+    Advance every flying lander of the batch by one time step on the given planet.
+    Same model as update_lander_state (gravity, drag, thrust, wrap-around, terrain collision, fuel usage),
+    applied to all landers at once. Landed and crashed landers are left untouched.
+    Returns the masks of landers that landed and crashed during this step.
+    """
+    active = batch.active
+
+    # Atmosphere density at the current altitudes
+    air_density = atmosphere_density_array(batch.y, planet.atmosphere_thickness, planet.air_ground_density)
+
+    # Drag factor: -0.5 * rho * Cd * S * |v|
+    drag = np.hypot(batch.vx, batch.vy)
+    drag *= air_density
+    drag *= batch.half_drag_area
+    np.negative(drag, out=drag)
+
+    # Thrust force
+    theta = np.radians(batch.angle)
+    thrust_force = batch.thrust * batch.max_thrust
+
+    # Accelerations, zeroed for landers that are no longer flying
+    ax = np.sin(theta)
+    ax *= thrust_force
+    ax += drag * batch.vx
+    ax *= batch.inv_mass
+    ay = np.cos(theta)
+    ay *= thrust_force
+    ay += drag * batch.vy
+    ay -= batch.mass * planet.gravity_constant
+    ay *= batch.inv_mass
+    step = active * dt
+    ax *= step
+    ay *= step
+
+    # Update velocity and position
+    batch.vx += ax
+    batch.vy += ay
+    batch.x += batch.vx * step
+    batch.y += batch.vy * step
+    ground_length = planet.ground_length
+    batch.x -= ground_length * (batch.x > ground_length)
+    batch.x += ground_length * (batch.x < 0)
+
+    # Check for terrain collision
+    terrain_height = planet.terrain_index.heights_at(batch.x)
+    hit = active & (batch.y <= terrain_height)
+    landed = (hit
+              & (batch.x >= planet.landing_zone[0][0])
+              & (batch.x <= planet.landing_zone[1][0])
+              & (batch.angle == 0)
+              & (np.abs(batch.vx) < MAX_HORIZONTAL_LANDING_SPEED)
+              & (batch.vy > -MAX_VERTICAL_LANDING_SPEED))
+    crashed = hit & ~landed
+    batch.is_landed |= landed
+    batch.crashed |= crashed
+
+    # Update the position again for landers that did not crash (same as update_lander_state)
+    step *= ~crashed
+    batch.x += batch.vx * step
+    batch.y += batch.vy * step
+
+    # Update fuel usage (constant consumption per unit of thrust)
+    fuel_used = batch.thrust * batch.fuel_rate
+    fuel_used *= active * dt
+    batch.fuel -= fuel_used
+    np.maximum(batch.fuel, 0, out=batch.fuel)
+
+    return landed, crashed
+
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+# Contains planet environments and simulations
+# Vectorized landing environment (Gym-style API)
+
+# environments/lander_env.py
+
+import numpy as np
+
+from ai_models.basic_ai import static_state_features, dynamic_state_features
+from environments.batch_physics import LanderBatch, update_landers
+from environments.planet import PlanetBatch
+from environments.scenarios import random_scenario
+from training.reward_functions import compute_reward_batch
+
+
+class LanderVecEnv:
+    """
+    Batch of K independent landing episodes stepped in lock-step, with a Gym-style API:
+    reset(seeds) -> observations, step(actions) -> (observations, rewards, dones, info).
+    Observations are the BasicAI state vectors (float32, shape (K, state_size)), actions are the
+    flat DQNAI action indices (thrust_idx * 5 + angle_idx), or None to hold the commands of the last actions
+    (frame skip, like BasicAI.hold). Each episode is drawn by random_scenario
+    from its own seed, so an episode is fully determined by its seed. With a scenario_bank (ScenarioBank),
+    the seeds are indices of bank scenarios instead.
+    An episode ends when the lander lands, crashes or reaches total_time. With autoreset, finished
+    sub-environments immediately start a new episode (the observation returned for them is the first one
+    of the new episode, the last one of the finished episode is in info['terminal_observation']).
+    """
+    def __init__(self, num_envs, total_time=100, dt=0.1, num_rays=5, max_distance=1000, seed=None, autoreset=True,
+                 scenario_bank=None):
+        self.num_envs = num_envs
+        self.dt = dt
+        self.max_steps = int(total_time / dt)
+        self.num_rays = num_rays
+        self.max_distance = max_distance
+        self.autoreset = autoreset
+        self.rng = np.random.default_rng(seed)  # Draws the seeds of the episodes
+        self.scenario_bank = scenario_bank
+        self.num_seeds = 2**63 if scenario_bank is None else len(scenario_bank)
+
+        self.thrust_bins = np.linspace(0, 1, 5)  # Same discrete actions as DQNAI
+        self.angle_bins = np.linspace(-15, 15, 5)
+        self.action_size = len(self.thrust_bins) * len(self.angle_bins)
+        self.state_size = 4 + 5 + 2 + 2 + 1 + 1 + num_rays
+
+        self.planets = None
+        self.landers = None
+        self.observations = np.zeros((num_envs, self.state_size), dtype=np.float32)
+        self.seeds = np.zeros(num_envs, dtype=np.int64)
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+        self.landing_x_center = np.zeros(num_envs)
+        self.landing_y_center = np.zeros(num_envs)
+        self.prev_dx = np.zeros(num_envs)
+        self.prev_dy = np.zeros(num_envs)
+        self.prev_fuel = np.zeros(num_envs)
+        self.held_thrust = np.zeros(num_envs)  # Commands of the last actions (thrust, target angle)
+        self.held_angle = np.zeros(num_envs)
+
+    def reset(self, seeds=None):
+        """Start a new episode in every sub-environment (from the given seeds, or from seeds drawn by the env)."""
+        if seeds is None:
+            seeds = self.rng.integers(self.num_seeds, size=self.num_envs)
+        scenarios = [self.scenario(seed) for seed in seeds]
+        self.planets = PlanetBatch([planet for planet, _, _ in scenarios])
+        self.landers = LanderBatch.from_landers([lander for _, lander, _ in scenarios])
+        self.seeds[:] = seeds
+        self._start_episodes(np.arange(self.num_envs))
+        return self._observe()
+
+    def step(self, actions):
+        """
+        Apply one action per sub-environment (None: hold the last ones) and advance the physics by dt.
+        Returns (observations, rewards, dones, info); info holds per-environment arrays: the reward components,
+        'landed', 'crashed', 'timeout', 'steps' (episode length so far) and 'seeds'.
+        """
+        landers = self.landers
+        if actions is not None:
+            thrust_idx, angle_idx = np.divmod(np.asarray(actions), len(self.angle_bins))
+            self.held_thrust = self.thrust_bins[thrust_idx]
+            self.held_angle = landers.angle + self.angle_bins[angle_idx]
+        landers.pilot_commands(self.held_thrust, self.held_angle)
+        update_landers(landers, self.planets, self.dt)
+        self.steps += 1
+
+        rewards, distance_reward, v_speed_penalty, h_speed_penalty, fuel_penalty, self.prev_dx, self.prev_dy, self.prev_fuel = \
+            compute_reward_batch(landers, self.planets.landing_zone, self.prev_dx, self.prev_dy, self.prev_fuel)
+
+        landed = landers.is_landed.copy()
+        crashed = landers.crashed.copy()
+        timeout = (self.steps >= self.max_steps) & ~(landed | crashed)
+        dones = landed | crashed | timeout
+        info = {'distance_reward': distance_reward,
+                'vertical_speed_penalty': v_speed_penalty,
+                'horizontal_speed_penalty': h_speed_penalty,
+                'fuel_penalty': fuel_penalty,
+                'landed': landed,
+                'crashed': crashed,
+                'timeout': timeout,
+                'steps': self.steps.copy(),
+                'seeds': self.seeds.copy()}
+
+        observations = self._observe()
+        if self.autoreset and dones.any():
+            info['terminal_observation'] = observations.copy()
+            self._reset_envs(np.flatnonzero(dones))
+            observations = self._observe()
+        return observations, rewards, dones, info
+
+    def scenario(self, seed):
+        """(planet, lander, start_position) of the episode of the given seed (or bank index)."""
+        if self.scenario_bank is None:
+            return random_scenario(np.random.default_rng(seed))
+        return self.scenario_bank.scenario(int(seed))
+
+    def _reset_envs(self, index):
+        """Start new episodes in the given sub-environments, from freshly drawn seeds."""
+        for i in index:
+            seed = self.rng.integers(self.num_seeds)
+            planet, lander, _ = self.scenario(seed)
+            self.planets.set(i, planet)
+            self.landers.set_lander(i, lander)
+            self.seeds[i] = seed
+        self.landers.update_constants()
+        self._start_episodes(index)
+
+    def _start_episodes(self, index):
+        """Initialize the episode bookkeeping (as Animation does) and static features of the given sub-environments."""
+        planets = self.planets
+        landing_zone = planets.landing_zone
+        self.landing_x_center[index] = (landing_zone[0][0][index] + landing_zone[1][0][index]) / 2
+        self.landing_y_center[index] = landing_zone[0][1][index]
+        x = self.landers.x[index]
+        self.prev_dx[index] = np.minimum(np.abs(x - self.landing_x_center[index]),
+                                         np.abs(x + planets.ground_length[index] - self.landing_x_center[index]))
+        self.prev_dy[index] = np.abs(self.landers.y[index] - self.landing_y_center[index])
+        self.prev_fuel[index] = 100
+        self.steps[index] = 0
+        static_state_features(planets, self.landers, self.observations)
+
+    def _observe(self):
+        """Write the dynamic part of the observations of every sub-environment."""
+        landers = self.landers
+        terrain_info = landers.sense_terrain(self.planets, num_rays=self.num_rays, max_distance=self.max_distance)
+        dynamic_state_features(landers.x, landers.y, landers.vx, landers.vy, landers.angle, landers.fuel, terrain_info,
+                               self.planets, self.landing_x_center, self.landing_y_center, self.observations)
+        return self.observations
@@ -5,7 +5,7 @@
 
 import numpy as np
 import logging
-import bisect
+import math
 
 MAX_HORIZONTAL_LANDING_SPEED = 5
 MAX_VERTICAL_LANDING_SPEED = 5
@@ -17,69 +17,182 @@ def compute_drag(velocity, drag_coeff, air_density, surface_area):
 
 def update_lander_state(lander, planet, dt):
     """Update the lander's position based on physics (gravity, drag, thrust)."""
-    if lander.is_landed:
-        return
-
-    # Compute the atmosphere density at the current altitude
-    altitude = lander.position[1]
-    air_density = planet.atmosphere_density(altitude)
-
-    # Gravity force
-    gravity_force = np.array([0, -lander.mass * planet.gravity_constant])
-
-    # Drag force
-    drag_force = compute_drag(lander.velocity, lander.drag_coeff, air_density, lander.surface_area)
-
-    # Thrust force (assume thrust is applied directly opposite of gravity)
-    thrust_force = np.array(
-        [lander.thrust*lander.max_thrust * np.sin(np.radians(lander.angle)),
-         lander.thrust*lander.max_thrust * np.cos(np.radians(lander.angle))])
-
-    # Total force on the lander
-    total_force = gravity_force + drag_force + thrust_force
-
-    # Update velocity and position
-    acceleration = total_force / lander.mass
-    lander.velocity += acceleration * dt
-    lander.position += lander.velocity * dt
-    if lander.position[0]>planet.ground_length :
-        lander.position[0] -= planet.ground_length
-    elif lander.position[0] < 0 :
-        lander.position[0] += planet.ground_length
-    else:
-        pass
-    
-    # Check for terrain collision (lander's y position should be above the terrain)
-    landed_or_crashed = detect_terrain_collision(lander, planet)
-    if landed_or_crashed == 'flying':
-        pass
-    elif landed_or_crashed == 'crashed':
-        lander.crashed = True
-        logging.info("Lander has crashed !")
-    elif landed_or_crashed == 'landed':
-        lander.is_landed = True
-        logging.info("Lander has landed !! !oo! !!")
-        
-    # Update the lander's position only if it has not crashed
-    if not lander.crashed:
-        lander.position[0] += lander.velocity[0] * dt  # Update x position
-        lander.position[1] += lander.velocity[1] * dt  # Update y position
-
-    # Update fuel usage (assume constant consumption per unit of thrust)
-    df = lander.thrust*lander.max_thrust * dt/lander.max_fuel
-    logging.info(f"fuel variation = {df}")
-    lander.fuel -= df
-    lander.fuel = max(0, lander.fuel)
-    
-    
-    
-    return 0
+    return LanderStepper(lander, planet).step(dt)
+
+class LanderStepper:
+    """
+    Scalar physics kernel for one lander on one planet.
+    Works on plain floats and precomputes the constants that do not change during an episode,
+    so that stepping allocates no arrays. Build it once per episode (after Lander.reset) and call step(dt).
+    """
+    def __init__(self, lander, planet):
+        self.lander = lander
+        self.planet = planet
+        # Per-episode constants
+        self.half_drag_area = 0.5 * lander.drag_coeff * lander.surface_area
+        self.weight = lander.mass * planet.gravity_constant
+        self.mass = lander.mass
+        self.max_thrust = lander.max_thrust
+        self.max_fuel = lander.max_fuel
+        self.atmosphere_thickness = planet.atmosphere_thickness
+        self.air_ground_density = planet.air_ground_density
+        self.ground_length = planet.ground_length
+        self.terrain_index = planet.terrain_index
+        self.max_terrain_height = planet.terrain_index.max_height
+
+    def step(self, dt):
+        """Advance the lander by dt, same model as the original update_lander_state."""
+        lander = self.lander
+        if lander.is_landed:
+            return
+
+        x, y = lander.position.tolist()
+        vx, vy = lander.velocity.tolist()
+
+        # Compute the atmosphere density at the current altitude
+        if y >= self.atmosphere_thickness:
+            air_density = 0.0
+        elif y <= 0:
+            air_density = self.air_ground_density
+        else:
+            air_density = (1 - (y / self.atmosphere_thickness)) * self.air_ground_density
+
+        # Drag factor: -0.5 * rho * Cd * S * |v|
+        drag = -air_density * self.half_drag_area * math.sqrt(vx * vx + vy * vy)
+
+        # Thrust force along the lander axis
+        thrust_force = lander.thrust * self.max_thrust
+        theta = math.radians(lander.angle)
+
+        # Update velocity and position (gravity + drag + thrust)
+        vx += (drag * vx + thrust_force * math.sin(theta)) / self.mass * dt
+        vy += (-self.weight + drag * vy + thrust_force * math.cos(theta)) / self.mass * dt
+        x += vx * dt
+        y += vy * dt
+        if x > self.ground_length:
+            x -= self.ground_length
+        elif x < 0:
+            x += self.ground_length
+
+        position = lander.position
+        velocity = lander.velocity
+        position[0] = x
+        position[1] = y
+        velocity[0] = vx
+        velocity[1] = vy
+
+        # Check for terrain collision (lander's y position should be above the terrain)
+        landed_or_crashed = detect_terrain_collision(lander, self.planet)
+        if landed_or_crashed == 'crashed':
+            lander.crashed = True
+            logging.info("Lander has crashed !")
+        elif landed_or_crashed == 'landed':
+            lander.is_landed = True
+            logging.info("Lander has landed !! !oo! !!")
+
+        # Update the lander's position only if it has not crashed
+        if not lander.crashed:
+            position[0] = x + vx * dt
+            position[1] = y + vy * dt
+
+        # Update fuel usage (assume constant consumption per unit of thrust)
+        lander.fuel = max(0, lander.fuel - thrust_force * dt / self.max_fuel)
+
+        return 0
+
+    def step_adaptive(self, dt, max_dt, safety=0.5, position_tolerance=0.5, time_tolerance=1e-6):
+        """
+        One integration step of adaptive length, returns its duration.
+        Far above the terrain the step grows up to max_dt, as long as the lander cannot reach the highest
+        terrain point within it (worst-case downward acceleration) and the local error estimate (midpoint vs
+        Euler position) stays below position_tolerance meters; near the ground it is dt.
+        A step ending below the terrain is cut at the touchdown instant, found by bisection (to time_tolerance
+        seconds), so the landing check sees the velocity at impact.
+        Unlike step(), this is a midpoint (second order) integration with one position update per step.
+        """
+        lander = self.lander
+        if lander.is_landed or lander.crashed:
+            return dt
+        x, y = lander.position.tolist()
+        vx, vy = lander.velocity.tolist()
+        thrust_force = lander.thrust * self.max_thrust
+        theta = math.radians(lander.angle)
+        thrust_x = thrust_force * math.sin(theta)
+        thrust_y = thrust_force * math.cos(theta)
+
+        def acceleration(y, vx, vy):
+            if y >= self.atmosphere_thickness:
+                air_density = 0.0
+            elif y <= 0:
+                air_density = self.air_ground_density
+            else:
+                air_density = (1 - (y / self.atmosphere_thickness)) * self.air_ground_density
+            drag = -air_density * self.half_drag_area * math.sqrt(vx * vx + vy * vy)
+            return (drag * vx + thrust_x) / self.mass, (-self.weight + drag * vy + thrust_y) / self.mass
+
+        ax, ay = acceleration(y, vx, vy)
+
+        def state_after(t):
+            # Midpoint method: velocity and acceleration at t/2 drive the whole step
+            half_vx = vx + ax * t / 2
+            half_vy = vy + ay * t / 2
+            half_ax, half_ay = acceleration(y + half_vy * t / 2, half_vx, half_vy)
+            return (x + half_vx * t) % self.ground_length, y + half_vy * t, vx + half_ax * t, vy + half_ay * t
+
+        # Step length: a fraction of the shortest time to fall to the highest terrain point
+        clearance = y - self.max_terrain_height
+        step = dt
+        if clearance > 0 and max_dt > dt:
+            fall_speed = max(-vy, 0.0)
+            fall_accel = self.weight / self.mass + (self.max_thrust + self.air_ground_density * self.half_drag_area
+                                                    * (vx * vx + vy * vy)) / self.mass
+            time_to_terrain = (math.sqrt(fall_speed * fall_speed + 2 * fall_accel * clearance) - fall_speed) / fall_accel
+            step = min(max(safety * time_to_terrain, dt), max_dt)
+        new_x, new_y, new_vx, new_vy = state_after(step)
+        while step > dt:
+            # Local error estimate: position drift between the midpoint and the start accelerations
+            error = math.hypot(new_vx - vx - ax * step, new_vy - vy - ay * step) * step / 2
+            if error <= position_tolerance:
+                break
+            step = max(dt, 0.9 * step * math.sqrt(position_tolerance / error))
+            new_x, new_y, new_vx, new_vy = state_after(step)
+
+        # Cut the step at the touchdown instant if it ends below the terrain
+        if new_y <= self.terrain_index.height_at(new_x):
+            above, below = 0.0, step
+            while below - above > time_tolerance:
+                middle = 0.5 * (above + below)
+                mid_x, mid_y, _, _ = state_after(middle)
+                if mid_y <= self.terrain_index.height_at(mid_x):
+                    below = middle
+                else:
+                    above = middle
+            step = below
+            new_x, new_y, new_vx, new_vy = state_after(step)
+
+        position = lander.position
+        velocity = lander.velocity
+        position[0] = new_x
+        position[1] = new_y
+        velocity[0] = new_vx
+        velocity[1] = new_vy
+
+        landed_or_crashed = detect_terrain_collision(lander, self.planet)
+        if landed_or_crashed == 'crashed':
+            lander.crashed = True
+            logging.info("Lander has crashed !")
+        elif landed_or_crashed == 'landed':
+            lander.is_landed = True
+            logging.info("Lander has landed !! !oo! !!")
+
+        lander.fuel = max(0, lander.fuel - thrust_force * step / self.max_fuel)
+        return step
 
 def detect_terrain_collision(lander, planet):
     """Check if the lander's position is below the terrain."""
 
     # Find the terrain height at the lander's current x position
-    terrain_height = get_terrain_height_at_x(lander, planet.terrain)
+    terrain_height = get_terrain_height_at_x(lander.position[0], planet)
     
     # If the lander's y position is below the terrain height, return True (crash detected)
     if lander.position[1] <= terrain_height:
@@ -92,25 +205,6 @@ def detect_terrain_collision(lander, planet):
         return 'crashed'
     return 'flying'
 
-def get_terrain_height_at_x(lander, terrain):
-    """Find the terrain height at the given x position using the lander's cached terrain index."""
-    x = lander.position[0]
-
-    # Unzip the terrain into two separate lists for x and y coordinates
-    terrain_x, terrain_y = zip(*terrain)
-
-    # Check if the cached terrain segment is still valid
-    if terrain_x[lander.last_terrain_idx] <= x <= terrain_x[lander.last_terrain_idx + 1]:
-        # Use the cached segment to compute the height
-        x1, y1 = terrain[lander.last_terrain_idx]
-        x2, y2 = terrain[lander.last_terrain_idx + 1]
-        return y1 + (y2 - y1) * (x - x1) / (x2 - x1)
-
-    # Perform binary search to find the correct segment if outside cached segment
-    lander.last_terrain_idx = bisect.bisect_left(terrain_x, x) - 1
-    lander.last_terrain_idx = max(0, min(lander.last_terrain_idx, len(terrain_x) - 2))
-
-    # Now that we found the correct segment, calculate the terrain height
-    x1, y1 = terrain[lander.last_terrain_idx]
-    x2, y2 = terrain[lander.last_terrain_idx + 1]
-    return y1 + (y2 - y1) * (x - x1) / (x2 - x1)
+def get_terrain_height_at_x(x, planet):
+    """Find the terrain height at the given x position using the planet's terrain index."""
+    return planet.terrain_index.height_at(x)
@@ -1,20 +1,31 @@
 # environments/planet.py
 
 import numpy as np
-import matplotlib.pyplot as plt
 import random
 
+from environments.terrain import TerrainIndex, TerrainBatch
+
 class Planet:
-    def __init__(self, radius=None, atmosphere_thickness=None, air_ground_density=None, gravity_constant=None):
-        self.radius = random.uniform(1000, 10000) if radius is None else radius
-        self.atmosphere_thickness = random.uniform(500, 1500) if atmosphere_thickness is None else atmosphere_thickness
-        self.air_ground_density = random.uniform(0.5, 3.0) if air_ground_density is None else air_ground_density
-        self.gravity_constant = random.uniform(1.0, 20.0) if gravity_constant is None else gravity_constant
+    def __init__(self, radius=None, atmosphere_thickness=None, air_ground_density=None, gravity_constant=None, rng=None,
+                 terrain=None, landing_zone=None):
+        # rng: optional numpy Generator used for every random draw (reproducible planets), global RNGs otherwise
+        # terrain, landing_zone: precomputed terrain points and landing zone (e.g. from a ScenarioBank), generated otherwise
+        self.rng = rng
+        uniform = random.uniform if rng is None else rng.uniform
+        self.radius = uniform(1000, 10000) if radius is None else radius
+        self.atmosphere_thickness = uniform(500, 1500) if atmosphere_thickness is None else atmosphere_thickness
+        self.air_ground_density = uniform(0.5, 3.0) if air_ground_density is None else air_ground_density
+        self.gravity_constant = uniform(1.0, 20.0) if gravity_constant is None else gravity_constant
         
         self.ground_length = self.radius * 2 * np.pi  # Circumference of the planet
 
         # Generate the terrain with a flat landing area
-        self.terrain, self.landing_zone = self.generate_terrain()
+        if terrain is None:
+            self.terrain, self.landing_zone = self.generate_terrain()
+        else:
+            self.terrain, self.landing_zone = terrain, landing_zone
+        # Array-backed index used for the height lookups (rebuild it if the terrain is replaced)
+        self.terrain_index = TerrainIndex(self.terrain)
         
 
     def atmosphere_density(self, altitude):
@@ -42,7 +53,7 @@ class Planet:
         x = np.linspace(0, total_length, num_points)
 
         # Generate terrain with random heights
-        y = np.random.uniform(-200, 200, size=num_points)
+        y = (np.random if self.rng is None else self.rng).uniform(-200, 200, size=num_points)
 
         # Make sure the terrain is periodic by setting y[0] = y[-1]
         y[-1] = y[0]
@@ -62,6 +73,7 @@ class Planet:
         """
         Display the terrain using matplotlib.
         """
+        import matplotlib.pyplot as plt  # Imported on demand: simulation and training stay headless
         x, y = zip(*self.terrain)
         plt.plot(x, y)
         plt.title("Periodic Terrain of the Planet with Flat Landing Area")
@@ -69,6 +81,33 @@ class Planet:
         plt.ylabel("Height (m)")
         plt.show()
 
-# Example usage
-planet = Planet(radius=6000, atmosphere_thickness=1000, air_ground_density=1.0, gravity_constant=9.8)
-planet.display_terrain()
+class PlanetBatch:
+    """
+    Several planets seen as one, for the batched physics (environments.batch_physics.update_landers):
+    the planet attributes are (num_planets,) arrays, landing_zone is indexed like Planet.landing_zone
+    (landing_zone[0][0] is the array of landing zone starts) and terrain_index is a TerrainBatch.
+    Planet i applies to lander i of the batch.
+    """
+    def __init__(self, planets):
+        self.size = len(planets)
+        self.radius = np.zeros(self.size)
+        self.atmosphere_thickness = np.zeros(self.size)
+        self.air_ground_density = np.zeros(self.size)
+        self.gravity_constant = np.zeros(self.size)
+        self.ground_length = np.zeros(self.size)
+        self.landing_zone = np.zeros((2, 2, self.size))
+        self.terrain_index = TerrainBatch([planet.terrain_index for planet in planets])
+        self.planets = list(planets)
+        for i, planet in enumerate(planets):
+            self.set(i, planet)
+
+    def set(self, i, planet):
+        """Replace planet i."""
+        self.planets[i] = planet
+        self.radius[i] = planet.radius
+        self.atmosphere_thickness[i] = planet.atmosphere_thickness
+        self.air_ground_density[i] = planet.air_ground_density
+        self.gravity_constant[i] = planet.gravity_constant
+        self.ground_length[i] = planet.ground_length
+        self.landing_zone[:, :, i] = planet.landing_zone
+        self.terrain_index.set(i, planet.terrain_index)
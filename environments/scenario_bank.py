@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# Contains planet environments and simulations
+# Precomputed bank of training scenarios (planet, terrain, lander and start state)
+
+# environments/scenario_bank.py
+#
+# Usage:
+#   python -m environments.scenario_bank scenarios.npy --size 100000 --seed 0
+
+import argparse
+
+import numpy as np
+
+from environments.planet import Planet
+from environments.scenarios import FUEL_DENSITY
+from lander.lander import Lander
+
+NUM_TERRAIN_POINTS = 100  # As generated by Planet.generate_terrain
+
+# Sampled parameters: (name, low, high), same ranges as random_scenario
+PARAMETERS = (
+    ('radius', 1000, 10000),
+    ('atmosphere_thickness', 500, 1500),
+    ('air_ground_density', 0.5, 3.0),
+    ('gravity_constant', 1.0, 20.0),
+    ('max_thrust', 500, 5000),
+    ('max_fuel', 500, 5000),
+    ('drag_coeff', 0.2, 0.8),
+    ('surface_area', 1.0, 10.0),
+    ('start_x', 0.0, 1.0),  # Fraction of the ground length
+    ('start_v', -10, 0),
+    ('start_a', -90, 90),
+)
+
+SCENARIO_DTYPE = np.dtype([(name, np.float64) for name, _, _ in PARAMETERS] + [
+    ('mass', np.float64),
+    ('terrain_y', np.float64, (NUM_TERRAIN_POINTS,)),
+    ('landing_zone', np.float64, (2, 2)),
+])
+
+
+def halton(size, dims, start=1):
+    """Points start..start+size-1 of the Halton low-discrepancy sequence in [0, 1)^dims (prime bases)."""
+    primes = []
+    candidate = 2
+    while len(primes) < dims:
+        if all(candidate % p for p in primes):
+            primes.append(candidate)
+        candidate += 1
+    points = np.zeros((size, dims))
+    for d, base in enumerate(primes):
+        n = np.arange(start, start + size)
+        scale = 1.0
+        while n.any():
+            scale /= base
+            n, digit = np.divmod(n, base)
+            points[:, d] += digit * scale
+    return points
+
+
+def generate_scenario_bank(path, size, seed=0):
+    """
+    Generate `size` scenarios and store them in a .npy file (structured array, see SCENARIO_DTYPE).
+    The continuous parameters follow a randomly shifted Halton sequence (evenly covering the parameter
+    ranges), the terrains are drawn from a Generator: the same seed always gives the same bank.
+    """
+    rng = np.random.default_rng(seed)
+    # Cranley-Patterson rotation: a seeded shift keeps the low discrepancy
+    unit = (halton(size, len(PARAMETERS)) + rng.random(len(PARAMETERS))) % 1.0
+    records = np.lib.format.open_memmap(path, mode='w+', dtype=SCENARIO_DTYPE, shape=(size,))
+    for d, (name, low, high) in enumerate(PARAMETERS):
+        records[name] = low + (high - low) * unit[:, d]
+    records['mass'] = records['max_fuel'] * FUEL_DENSITY + records['max_thrust'] / 200
+
+    for i in range(size):
+        record = records[i]
+        planet = Planet(radius=record['radius'], atmosphere_thickness=record['atmosphere_thickness'],
+                        air_ground_density=record['air_ground_density'], gravity_constant=record['gravity_constant'],
+                        rng=rng)
+        record['terrain_y'] = [y for _, y in planet.terrain]
+        record['landing_zone'] = planet.landing_zone
+    records.flush()
+    return ScenarioBank(path)
+
+
+class ScenarioBank:
+    """
+    Read-only, memory-mapped bank of scenarios written by generate_scenario_bank.
+    The file is mapped, not read: every process opening it shares the same pages (no copy per process),
+    and building a scenario only touches its own record.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.records = np.load(path, mmap_mode='r')
+        if self.records.dtype != SCENARIO_DTYPE:
+            raise ValueError(f"{path} is not a scenario bank")
+
+    def __len__(self):
+        return len(self.records)
+
+    def scenario(self, index):
+        """Scenario `index` as (planet, lander, start_position), like random_scenario (the lander is reset)."""
+        record = self.records[index % len(self.records)]
+        radius = float(record['radius'])
+        ground_length = radius * 2 * np.pi
+        x = np.linspace(0, ground_length, NUM_TERRAIN_POINTS)
+        terrain = list(zip(x, np.array(record['terrain_y'])))
+        (flat_start, y0), (flat_end, _) = record['landing_zone'].tolist()
+        landing_zone = [[int(flat_start), y0], [int(flat_end), y0]]
+        planet = Planet(radius=radius, atmosphere_thickness=float(record['atmosphere_thickness']),
+                        air_ground_density=float(record['air_ground_density']),
+                        gravity_constant=float(record['gravity_constant']),
+                        terrain=terrain, landing_zone=landing_zone)
+
+        start_position = (float(record['start_x']) * ground_length, planet.atmosphere_thickness,
+                          float(record['start_v']), 0, float(record['start_a']))  # x, y, v, t, a
+        lander = Lander(max_thrust=float(record['max_thrust']), max_fuel=float(record['max_fuel']),
+                        drag_coeff=float(record['drag_coeff']), mass=float(record['mass']),
+                        surface_area=float(record['surface_area']))
+        lander.reset(start_position)
+        return planet, lander, start_position
+
+    def sample(self, rng=None):
+        """A random scenario of the bank (drawn from rng, or from the global numpy RNG)."""
+        index = np.random.randint(len(self.records)) if rng is None else rng.integers(len(self.records))
+        return self.scenario(index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a scenario bank")
+    parser.add_argument('path', help="Output file (.npy)")
+    parser.add_argument('--size', type=int, default=100000, help="Number of scenarios")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+    bank = generate_scenario_bank(args.path, args.size, args.seed)
+    print(f"{len(bank)} scenarios written to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Contains planet environments and simulations
+# Random training scenarios (planet, lander and start position)
+
+# environments/scenarios.py
+
+import random
+
+from environments.planet import Planet
+from lander.lander import Lander
+
+FUEL_DENSITY = 0.1
+
+
+def random_scenario(rng=None):
+    """
+    Draw a random training scenario, from the global RNGs or from the given numpy Generator (reproducible).
+    Returns (planet, lander, start_position), the lander being already reset to the start position (x, y, v, t, a).
+    """
+    uniform = random.uniform if rng is None else rng.uniform
+    # Create a random planet
+    planet = Planet(rng=rng)
+    # Set random start position
+    start_x = uniform(0, planet.ground_length)
+    start_y = planet.atmosphere_thickness
+    start_v = uniform(-10, 0)
+    start_t = 0
+    start_a = uniform(-90, 90)
+    start_position = (start_x, start_y, start_v, start_t, start_a)  # x, y, v, t, a
+
+    # Initialize the lander
+    max_thrust = uniform(500, 5000)
+    max_fuel = uniform(500, 5000)
+    drag_coeff = uniform(0.2, 0.8)
+    surface_area = uniform(1.0, 10.0)
+
+    mass = max_fuel*FUEL_DENSITY + max_thrust/200
+
+    lander = Lander(max_thrust=max_thrust, max_fuel=max_fuel, drag_coeff=drag_coeff, mass=mass, surface_area=surface_area)
+    lander.reset(start_position)
+    return planet, lander, start_position
@@ -1,3 +1,202 @@
 # -*- coding: utf-8 -*-
 # Contains planet environments and simulations
-#    Terrain modeling and generation
\ No newline at end of file
+#    Terrain modeling and generation
+
+# environments/terrain.py
+
+import bisect
+import math
+import numpy as np
+
+
+def ray_angles(num_rays=5, spread=np.pi):
+    """
+    Directions of the sensing rays (radians, relative to the lander orientation).
+    The rays are spread evenly over `spread` radians, centered on the horizontal (0 = +x, -pi/2 = down).
+    """
+    return np.linspace(-spread / 2, spread / 2, num_rays)
+
+
+class TerrainIndex:
+    """
+    Compact, array-backed index of a terrain polyline.
+    Stores the x and y coordinates of the terrain points and the slope of every segment,
+    so the height at any x is found in O(1) on a uniform grid (direct index arithmetic),
+    or in O(log N) with a binary search on an irregular grid.
+    Outside of the terrain range, the first/last segment is extended (no wrap-around),
+    unless periodic=True is requested.
+    """
+    def __init__(self, terrain):
+        points = np.asarray(terrain, dtype=float)
+        self.x = np.ascontiguousarray(points[:, 0])
+        self.y = np.ascontiguousarray(points[:, 1])
+        widths = np.diff(self.x)
+        self.slope = np.diff(self.y) / widths
+        self.num_segments = len(self.x) - 1
+        self.x_start = self.x[0]
+        self.period = self.x[-1] - self.x[0]
+        self.max_height = self.y.max()
+        self.min_height = self.y.min()
+
+        # Uniform grid (as produced by Planet.generate_terrain): segment index = (x - x_start) / dx
+        self.uniform = bool(np.allclose(widths, widths[0], rtol=1e-9, atol=0))
+        self.dx = widths[0] if self.uniform else widths.min()
+        self.inv_dx = 1.0 / self.dx
+
+        # Plain Python copies for the scalar lookups (indexing lists is faster than indexing arrays)
+        self._x = self.x.tolist()
+        self._y = self.y.tolist()
+        self._slope = self.slope.tolist()
+
+    def segment_index(self, x):
+        """Index of the terrain segment containing x (clamped to the first/last segment)."""
+        if self.uniform:
+            i = int((x - self.x_start) * self.inv_dx)
+        else:
+            i = bisect.bisect_right(self._x, x) - 1
+        return min(max(i, 0), self.num_segments - 1)
+
+    def height_at(self, x, periodic=False):
+        """Terrain height at a single x position."""
+        if periodic:
+            x = self.x_start + (x - self.x_start) % self.period
+        i = self.segment_index(x)
+        return self._y[i] + self._slope[i] * (x - self._x[i])
+
+    def _rows(self, ndim):
+        """
+        Per-terrain parameters (base offset in the flat arrays, number of segments, x start, period, 1/dx),
+        shaped to broadcast against query arrays with `ndim` dimensions. Scalars for a single terrain.
+        """
+        return 0, self.num_segments, self.x_start, self.period, self.inv_dx
+
+    def segment_indices(self, xs):
+        """Vectorized segment_index for an array of x positions."""
+        xs = np.asarray(xs, dtype=float)
+        _, num_segments, x_start, _, inv_dx = self._rows(xs.ndim)
+        if self.uniform:
+            idx = ((xs - x_start) * inv_dx).astype(np.intp)
+        else:
+            idx = np.searchsorted(self.x, xs, side='right') - 1
+        return np.clip(idx, 0, num_segments - 1, out=idx)
+
+    def heights_at(self, xs, periodic=False):
+        """Terrain heights at an array of x positions."""
+        xs = np.asarray(xs, dtype=float)
+        base, _, x_start, period, _ = self._rows(xs.ndim)
+        if periodic:
+            xs = x_start + np.mod(xs - x_start, period)
+        idx = base + self.segment_indices(xs)
+        return self.y[idx] + self.slope[idx] * (xs - self.x[idx])
+
+    def cast_rays(self, x0, y0, angles, max_distance):
+        """
+        Distance from (x0, y0) to the terrain along rays of direction (cos(angle), sin(angle)).
+        Every ray is intersected in closed form with the terrain segments its x-range overlaps,
+        the terrain being periodic over its x range. x0, y0 and angles broadcast together
+        (e.g. x0, y0 of shape (n, 1) and angles of shape (n, num_rays) for a batch of landers).
+        Returns 0 for rays starting below the terrain and max_distance when nothing is hit.
+        """
+        x0 = np.asarray(x0, dtype=float)[..., None]
+        y0 = np.asarray(y0, dtype=float)[..., None]
+        angles = np.asarray(angles, dtype=float)
+        cos_a = np.cos(angles)[..., None]
+        sin_a = np.sin(angles)[..., None]
+        base, num_segments, x_start, period, inv_dx = self._rows(max(x0.ndim, cos_a.ndim))
+
+        # Candidate segments: a window of consecutive (unwrapped) segments starting at the left end of the ray
+        x_left = np.minimum(x0, x0 + max_distance * cos_a) - x_start
+        wraps = np.floor(x_left / period)
+        first = self.segment_indices(x_left - wraps * period + x_start)
+        window = math.ceil(max_distance * np.max(inv_dx)) + 2
+        k = (wraps.astype(np.intp) * num_segments + first) + np.arange(window)
+        wraps, seg = np.divmod(k, num_segments)
+        seg += base
+        offset = wraps * period - x0
+
+        # Segment x-range and terrain line relative to the ray origin
+        seg_x1 = self.x[seg] + offset
+        seg_x2 = self.x[seg + 1] + offset
+        slope = self.slope[seg]
+        clearance = y0 - (self.y[seg] - slope * seg_x1)  # Ray height above the segment line at t=0
+        closing = sin_a - slope * cos_a  # Rate of change of that clearance along the ray
+
+        # Range of ray parameters t over which the ray is above the segment (empty when t_in > t_out)
+        vertical = np.abs(cos_a) < 1e-12
+        inv_cos = 1.0 / np.where(vertical, 1.0, cos_a)
+        t1 = seg_x1 * inv_cos
+        t2 = seg_x2 * inv_cos
+        t_in = np.minimum(t1, t2)
+        t_out = np.maximum(t1, t2)
+        if vertical.any():
+            inside = (seg_x1 <= 0) & (seg_x2 >= 0)
+            t_in = np.where(vertical, np.where(inside, 0.0, 2 * max_distance), t_in)
+            t_out = np.where(vertical, np.where(inside, max_distance, -max_distance), t_out)
+        np.maximum(t_in, 0.0, out=t_in)
+        np.minimum(t_out, max_distance, out=t_out)
+
+        # First crossing of the segment line inside that range
+        f_in = clearance + closing * t_in
+        f_out = clearance + closing * t_out
+        hit = (t_in <= t_out) & ((f_in <= 0) | (f_out <= 0))
+        descending = closing < 0
+        t_hit = np.where(f_in <= 0, t_in, -clearance / np.where(descending, closing, -1.0))
+        t_hit = np.where(hit, t_hit, max_distance)
+        return t_hit.min(axis=-1)
+
+
+class TerrainBatch(TerrainIndex):
+    """
+    Terrains of several planets stacked row-wise in (num_terrains, num_points) arrays.
+    The vectorized queries (segment_indices, heights_at, cast_rays) apply row i of the batch
+    to entry i along the first axis of the query arrays; the scalar lookups are not available.
+    All terrains need the same number of points.
+    """
+    def __init__(self, indices):
+        num_terrains = len(indices)
+        self.num_points = len(indices[0].x)
+        self._x_rows = np.zeros((num_terrains, self.num_points))
+        self._y_rows = np.zeros((num_terrains, self.num_points))
+        self._slope_rows = np.zeros((num_terrains, self.num_points))  # Last column unused (padding)
+        self.x = self._x_rows.reshape(-1)
+        self.y = self._y_rows.reshape(-1)
+        self.slope = self._slope_rows.reshape(-1)
+        self.base = np.arange(num_terrains) * self.num_points
+        self.num_segments = np.full(num_terrains, self.num_points - 1)
+        self.x_start = np.zeros(num_terrains)
+        self.period = np.ones(num_terrains)
+        self.inv_dx = np.ones(num_terrains)
+        self.max_height = np.zeros(num_terrains)
+        self.min_height = np.zeros(num_terrains)
+        self.uniform_rows = np.zeros(num_terrains, dtype=bool)
+        for i, index in enumerate(indices):
+            self.set(i, index)
+
+    def set(self, i, index):
+        """Replace row i by the given TerrainIndex."""
+        if len(index.x) != self.num_points:
+            raise ValueError("All the terrains of a batch need the same number of points")
+        self._x_rows[i] = index.x
+        self._y_rows[i] = index.y
+        self._slope_rows[i, :-1] = index.slope
+        self.x_start[i] = index.x_start
+        self.period[i] = index.period
+        self.inv_dx[i] = index.inv_dx
+        self.max_height[i] = index.max_height
+        self.min_height[i] = index.min_height
+        self.uniform_rows[i] = index.uniform
+        self.uniform = bool(self.uniform_rows.all())
+
+    def _rows(self, ndim):
+        shape = (-1,) + (1,) * (ndim - 1)
+        return (self.base.reshape(shape), self.num_segments.reshape(shape), self.x_start.reshape(shape),
+                self.period.reshape(shape), self.inv_dx.reshape(shape))
+
+    def segment_indices(self, xs):
+        xs = np.asarray(xs, dtype=float)
+        if self.uniform:
+            return super().segment_indices(xs)
+        idx = np.empty(xs.shape, dtype=np.intp)
+        for i, row_x in enumerate(self._x_rows):
+            idx[i] = np.searchsorted(row_x, xs[i], side='right') - 1
+        return np.clip(idx, 0, self.num_points - 2, out=idx)
@@ -7,7 +7,7 @@
 import numpy as np
 import math
 
-from environments.physics import get_terrain_height_at_x
+from environments.terrain import ray_angles
 
 class Lander:
     def __init__(self, max_thrust, max_fuel, drag_coeff, mass, surface_area):
@@ -23,7 +23,6 @@ class Lander:
         self.fuel = 100.0  # Fuel remaining (percentage)
         self.is_landed = False
         self.crashed = False  # Reset crash status
-        self.last_terrain_idx = 0
 
     def get_state(self):
         """Return the current state of the lander."""
@@ -69,31 +68,19 @@ class Lander:
         """
         self.fuel = min(fuel_quantity, self.max_fuel)
     
-    def sense_terrain(self, planet, num_rays=5, max_distance=1000):
+    def sense_terrain(self, planet, num_rays=5, max_distance=1000, spread=np.pi):
         """
         Simulate terrain sensing with ray casting.
-        Returns an array of distances to obstacles in specified directions.
+        Returns an array of distances to obstacles in specified directions
+        (num_rays rays spread over `spread` radians, from -90 to +90 degrees relative to the lander by default).
         """
-        angles = np.linspace(-np.pi/2, np.pi/2, num_rays)  # Rays from -90 to +90 degrees relative to lander
-        distances = []
-    
-        for angle in angles:
-            distance = self.cast_ray(planet, angle, max_distance)
-            distances.append(distance)
-        
-        return distances
+        angles = ray_angles(num_rays, spread) + np.deg2rad(self.angle)  # Adjust for lander's orientation
+        return planet.terrain_index.cast_rays(self.position[0], self.position[1], angles, max_distance)
     
     def cast_ray(self, planet, angle, max_distance):
         """
         Cast a ray from the lander's current position at a given angle.
         Returns the distance to the first obstacle within max_distance.
         """
-        x0, y0 = self.position
         angle += np.deg2rad(self.angle)  # Adjust for lander's orientation
-        for d in np.linspace(0, max_distance, num=100):
-            x = x0 + d * np.cos(angle)
-            y = y0 + d * np.sin(angle)
-            terrain_height = get_terrain_height_at_x(self, planet.terrain)
-            if y <= terrain_height:
-                return d  # Obstacle detected
-        return max_distance  # No obstacle within max_distance
+        return float(planet.terrain_index.cast_rays(self.position[0], self.position[1], angle, max_distance))
@@ -10,8 +10,9 @@ import logging
 from lander.lander import Lander
 from environments.planet import Planet
 from ai_models.basic_ai import BasicAI
+from training.evaluate import find_latest_policy, load_policy, policy_settings
 from utils.animation import Animation
-from training.ai_trainer import train_ai_model, get_latest_model
+from utils.trajectory import TrajectoryRecorder
 
 FUEL_DENSITY = 0.05
 TRAINING = True
@@ -19,16 +20,77 @@ RESET_MODEL = False
 
 logging.basicConfig(level=logging.WARNING, force=True)
     
+def positive_int(value):
+    """argparse type of the options that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
 def main():
     # Argument parser for command-line arguments
     parser = argparse.ArgumentParser(description="Lander simulation")
     parser.add_argument('--display', action='store_true', help="Enable display for animation")
     parser.add_argument('--training', action='store_true', help="Launch ai-model training")
+    parser.add_argument('--workers', type=int, default=0, help="Number of actor processes running training episodes (0: single process)")
+    parser.add_argument('--scenario-bank', default=None, metavar='FILE',
+                        help="Train and evaluate on the scenarios of a bank (see environments/scenario_bank.py) instead of random ones")
+    parser.add_argument('--evaluate', nargs='?', type=int, const=1000, default=None, metavar='EPISODES',
+                        help="Evaluate the greedy policy of the latest saved model (or --model) on EPISODES seeded scenarios")
+    parser.add_argument('--model', default=None, help="Model file to evaluate (.npz policy export or .pth)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the evaluation scenarios")
+    parser.add_argument('--eval-output', default=None, metavar='FILE', help="Write the evaluation summary to FILE (JSON)")
+    parser.add_argument('--record', default=None, metavar='DIR',
+                        help="Record the trajectories of the simulated episodes in DIR (training, evaluation, or simulation with --display/--export)")
+    parser.add_argument('--replay', default=None, metavar='DIR',
+                        help="Play back a recorded episode of DIR (no simulation), see --episode")
+    parser.add_argument('--episode', type=int, default=None, help="Episode number to play back (default: the last recorded)")
+    parser.add_argument('--log-transitions', default=None, metavar='DIR',
+                        help="Append the transitions of the training episodes to a dataset in DIR")
+    parser.add_argument('--pretrain', default=None, metavar='DIR',
+                        help="Train offline on the transitions of the dataset in DIR before the training episodes")
+    parser.add_argument('--pretrain-epochs', type=int, default=1, help="Passes over the --pretrain dataset")
+    parser.add_argument('--time-warp', type=positive_int, default=1, metavar='K',
+                        help="Physics steps simulated per rendered frame (display and --export)")
+    parser.add_argument('--export', default=None, metavar='FILE',
+                        help="Render the simulation off-screen to a video (.mp4) or a GIF instead of displaying it")
+    parser.add_argument('--profile', nargs='?', const='profile.json', default=None, metavar='FILE',
+                        help="Time the stages of every episode, print a report and export it to FILE (JSON) and FILE.folded (flamegraph stacks)")
     
     args = parser.parse_args()
 
-    if args.training or TRAINING:
-        train_ai_model(num_episodes=10000, save_interval=100, reset_model=RESET_MODEL)
+    if args.profile:
+        from utils.profiler import Profiler
+        profiler = Profiler().install()
+        try:
+            return run(args)
+        finally:
+            profiler.uninstall()
+            print(profiler.report())
+            profiler.to_json(args.profile)
+            profiler.to_folded(args.profile + '.folded')
+    return run(args)
+
+def run(args):
+    """Play back a recording, evaluate or train the AI, or run one simulation."""
+    if args.replay:
+        from utils.trajectory import TrajectoryReader, play
+        index = -1 if args.episode is None else TrajectoryReader(args.replay).find(args.episode)
+        play(args.replay, index)
+        return 0
+
+    if args.evaluate:
+        from training.evaluate import evaluate_checkpoint
+        evaluate_checkpoint(args.model, num_episodes=args.evaluate, seed=args.seed, num_workers=args.workers,
+                            output=args.eval_output, record_dir=args.record, scenario_bank=args.scenario_bank)
+        return 0
+
+    # --display and --export show one simulation (training is the default run otherwise)
+    if args.training or (TRAINING and not (args.display or args.export)):
+        from training.ai_trainer import train_ai_model
+        train_ai_model(num_episodes=10000, save_interval=100, reset_model=RESET_MODEL, num_workers=args.workers,
+                       scenario_bank=args.scenario_bank, record_dir=args.record,
+                       dataset_dir=args.log_transitions, pretrain_dir=args.pretrain, pretrain_epochs=args.pretrain_epochs)
         return 0
 
     # Define planet properties
@@ -68,19 +130,31 @@ def main():
     t0 = 0
     start_position = (x0, y0, v0, a0, t0)  # Start at x=5000, altitude=800, speed = 0, angle=0, thrust=0
 
-    # Create basic AI model
-    ai_model = BasicAI(lander, planet)
+    # Create basic AI model (flying the latest saved policy, found from the checkpoint manifest:
+    # no torch needed for policy exports)
     save_dir="ai_models/models_saved"
-    latest_model = get_latest_model(save_dir)
-    if latest_model :
-        ai_model.ai_model.load(latest_model)
+    latest_model = find_latest_policy(save_dir)
+    # Fly it with the action repeat and integrator it was trained with
+    settings = policy_settings(latest_model) if latest_model else {'action_repeat': 1, 'integrator': 'fixed'}
+    if latest_model and not latest_model.endswith('.pth'):
+        ai_model = BasicAI(lander, planet, action_repeat=settings['action_repeat'], policy=load_policy(latest_model))
+    else:
+        ai_model = BasicAI(lander, planet)
+        if latest_model :
+            ai_model.ai_model.load(latest_model)
 
     # Create the Animation object without display
-    animation = Animation(lander, ai_model, planet, start_position,
-                          total_time=100.0, display=args.display)
+    recorder = TrajectoryRecorder(args.record) if args.record else None
+    animation = Animation(lander, ai_model, planet, start_position, total_time=100.0, display=args.display,
+                          integrator=settings['integrator'], recorder=recorder, time_warp=args.time_warp)
 
-    # Run the simulation (no display)
-    animation.run()
+    # Run the simulation (displayed live, exported to a file or headless)
+    if args.export:
+        animation.export(args.export)
+    else:
+        animation.run()
+    if recorder is not None:
+        recorder.close()
     
     return 0
 
@@ -1,2 +1,143 @@
 # -*- coding: utf-8 -*-
 
+# tests/test_ai_models.py
+
+import numpy as np
+
+from ai_models.replay_buffer import SumTree, PrioritizedReplayBuffer
+
+
+def reference_find(priorities, values):
+    """Slots whose cumulative priority range contains each value, from a plain cumulative sum."""
+    return np.searchsorted(np.cumsum(priorities), values, side='right')
+
+
+def test_sum_tree_find_and_update_match_cumulative_sums():
+    rng = np.random.default_rng(0)
+    for capacity in (1, 5, 64, 100):
+        tree = SumTree(capacity)
+        priorities = np.zeros(capacity)
+        for _ in range(20):
+            indices = rng.choice(capacity, size=rng.integers(1, capacity + 1), replace=False)
+            priorities[indices] = rng.uniform(0.01, 10, len(indices))
+            tree.update(indices, priorities[indices])
+            slot = int(rng.integers(capacity))
+            priorities[slot] = 0.5
+            tree.set(slot, 0.5)
+            np.testing.assert_array_equal(tree.get(np.arange(capacity)), priorities)
+            assert np.isclose(tree.total(), priorities.sum())
+            values = rng.uniform(0, priorities.sum(), 1000)
+            np.testing.assert_array_equal(tree.find(values), reference_find(priorities, values))
+
+
+def test_prioritized_replay_state_dict_keeps_priorities():
+    rng = np.random.default_rng(1)
+    state_size = 4
+    buffer = PrioritizedReplayBuffer(50, state_size)
+    for _ in range(70):  # Wraps around the ring
+        buffer.add(rng.normal(size=state_size), int(rng.integers(25)), rng.normal(), rng.normal(size=state_size), 0.0)
+    indices = rng.choice(50, size=30, replace=False)
+    buffer.update_priorities(indices, rng.normal(size=30) * 5)
+    buffer.beta = 0.7
+
+    restored = PrioritizedReplayBuffer(50, state_size)
+    restored.load_state_dict(buffer.state_dict())
+    np.testing.assert_allclose(restored.tree.get(np.arange(50)), buffer.tree.get(np.arange(50)))
+    assert np.isclose(restored.tree.total(), buffer.tree.total())
+    assert restored.max_priority == buffer.max_priority
+    assert restored.beta == buffer.beta
+    assert restored.position == buffer.position and len(restored) == len(buffer)
+    np.testing.assert_array_equal(restored.states, buffer.states)
+    np.testing.assert_array_equal(restored.actions, buffer.actions)
+
+
+def filled_dqn(seed, transitions=200, gradient_steps=5):
+    """Prioritized DQNAI with some transitions in memory and a few gradient steps done."""
+    import torch
+    from ai_models.dqn_ai import DQNAI
+    torch.manual_seed(seed)
+    np.random.seed(seed)
+    dqn = DQNAI(None, None, 20, 2, max_memory_size=500, prioritized=True)
+    dqn.batch_size = 32
+    rng = np.random.default_rng(seed)
+    for _ in range(transitions):
+        dqn.remember(rng.normal(size=20).astype(np.float32), (int(rng.integers(5)), int(rng.integers(5))),
+                     float(rng.normal()), rng.normal(size=20).astype(np.float32), 0.0)
+    for _ in range(gradient_steps):
+        dqn.replay()
+    return dqn
+
+
+def test_checkpoint_round_trip(tmp_path):
+    import random
+    import torch
+    from training.checkpoints import CheckpointManager, read_manifest
+
+    dqn = filled_dqn(0)
+    random.seed(1)
+    np.random.seed(1)
+    torch.manual_seed(1)
+    manager = CheckpointManager(str(tmp_path), keep_last=2, save_replay=True)
+    manager.save(10, dqn, extra={'env_steps': 1234})
+    manager.wait()
+    # The RNG draws that follow the checkpoint, to be replayed after the restore
+    expected_draws = (random.random(), np.random.rand(), torch.rand(1).item())
+
+    restored = filled_dqn(1, transitions=100, gradient_steps=1)
+    extra = CheckpointManager(str(tmp_path)).restore(restored)
+    assert extra == {'env_steps': 1234, 'episode': 10}
+    assert (random.random(), np.random.rand(), torch.rand(1).item()) == expected_draws
+    for model in ('model', 'target_model'):
+        for name, value in getattr(dqn, model).state_dict().items():
+            assert torch.equal(getattr(restored, model).state_dict()[name], value)
+    optimizer, restored_optimizer = dqn.optimizer.state_dict(), restored.optimizer.state_dict()
+    for key, state in optimizer['state'].items():
+        for name, value in state.items():
+            assert torch.equal(restored_optimizer['state'][key][name], value)
+    assert restored.epsilon == dqn.epsilon
+    assert restored.train_steps == dqn.train_steps
+    assert len(restored.memory) == len(dqn.memory) and restored.memory.position == dqn.memory.position
+    np.testing.assert_array_equal(restored.memory.states, dqn.memory.states)
+    np.testing.assert_array_equal(restored.memory.rewards, dqn.memory.rewards)
+    np.testing.assert_allclose(restored.memory.tree.get(np.arange(500)), dqn.memory.tree.get(np.arange(500)))
+
+    # Only the keep_last latest checkpoints stay, on disk and in the manifest
+    manager.save(20, dqn)
+    manager.save(30, dqn)
+    manager.close()
+    assert [entry['episode'] for entry in read_manifest(str(tmp_path))] == [20, 30]
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        'ai_model_episode_20.ckpt', 'ai_model_episode_20.npz', 'ai_model_episode_20.replay.npz',
+        'ai_model_episode_30.ckpt', 'ai_model_episode_30.npz', 'ai_model_episode_30.replay.npz', 'manifest.json']
+
+
+def test_transition_dataset_round_trip(tmp_path):
+    from training.data_collector import TransitionWriter, TransitionDataset
+
+    rng = np.random.default_rng(2)
+    state_size = 3
+    total = 0
+    # Uneven shards: 100-transition shards, a partial one on close, then more shards appended on reopen
+    for batch_sizes in ([60, 70, 7], [150, 50]):
+        writer = TransitionWriter(str(tmp_path), state_size, shard_size=100)
+        for n in batch_sizes:
+            states = np.arange(total, total + n, dtype=np.float32)[:, None].repeat(state_size, axis=1)
+            writer.add_batch(states, rng.integers(25, size=n), np.arange(total, total + n, dtype=np.float32),
+                             states + 1, np.zeros(n, dtype=np.float32))
+            total += n
+        writer.close()
+
+    dataset = TransitionDataset(str(tmp_path))
+    assert [len(shard['rewards']) for shard in dataset.shards] == [100, 37, 100, 100]
+    assert len(dataset) == total == 337
+    for shuffle in (False, True):
+        batches = list(dataset.batches(64, shuffle=shuffle, rng=0, drop_last=False))
+        assert [len(batch[2]) for batch in batches] == [64] * 5 + [17]
+        rewards = np.concatenate([batch[2] for batch in batches])
+        np.testing.assert_array_equal(np.sort(rewards), np.arange(total))  # Every transition exactly once
+        for states, actions, rewards, next_states, dones in batches:
+            assert actions.dtype == np.int64
+            np.testing.assert_array_equal(states[:, 0], rewards)  # Columns stay aligned
+            np.testing.assert_array_equal(next_states, states + 1)
+        dropped = list(dataset.batches(64, shuffle=shuffle, rng=0, drop_last=True))
+        assert [len(batch[2]) for batch in dropped] == [64] * 5
@@ -1,2 +1,96 @@
 # -*- coding: utf-8 -*-
 
+# tests/test_environment.py
+
+import numpy as np
+
+from environments.batch_physics import LanderBatch, update_landers
+from environments.physics import LanderStepper
+from environments.planet import Planet, PlanetBatch
+from environments.scenarios import random_scenario
+from environments.terrain import TerrainBatch
+
+SEEDS = range(8)
+
+
+def brute_force_height(terrain, x):
+    """Terrain height at x by a linear scan of the segments."""
+    for (x1, y1), (x2, y2) in zip(terrain[:-1], terrain[1:]):
+        if x1 <= x <= x2:
+            return y1 + (y2 - y1) * (x - x1) / (x2 - x1)
+    raise ValueError(f"{x} is outside of the terrain")
+
+
+def test_update_landers_matches_scalar_stepper():
+    scenarios = [random_scenario(np.random.default_rng(seed)) for seed in SEEDS]
+    planets = [planet for planet, _, _ in scenarios]
+    landers = [lander for _, lander, _ in scenarios]
+    batch = LanderBatch.from_landers(landers)
+    planet_batch = PlanetBatch(planets)
+    steppers = [LanderStepper(lander, planet) for lander, planet in zip(landers, planets)]
+
+    rng = np.random.default_rng(0)
+    for _ in range(1000):
+        thrust = rng.uniform(0, 1, len(landers))
+        angle = batch.angle + rng.uniform(-15, 15, len(landers))
+        batch.pilot_commands(thrust, angle)
+        for i, (lander, stepper) in enumerate(zip(landers, steppers)):
+            if not (lander.is_landed or lander.crashed):
+                lander.pilot_commands(thrust=thrust[i], angle=angle[i])
+                stepper.step(0.1)
+        update_landers(batch, planet_batch, 0.1)
+        if not batch.active.any():
+            break
+
+    for i, lander in enumerate(landers):
+        np.testing.assert_allclose([batch.x[i], batch.y[i]], lander.position, rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose([batch.vx[i], batch.vy[i]], lander.velocity, rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(batch.fuel[i], lander.fuel, rtol=1e-9, atol=1e-9)
+        assert batch.is_landed[i] == lander.is_landed
+        assert batch.crashed[i] == lander.crashed
+    assert batch.crashed.any()  # The comparison covered touchdowns
+
+
+def test_heights_at_matches_brute_force():
+    rng = np.random.default_rng(1)
+    for seed in SEEDS:
+        planet = Planet(rng=np.random.default_rng(seed))
+        index = planet.terrain_index
+        xs = rng.uniform(0, planet.ground_length, 200)
+        expected = [brute_force_height(planet.terrain, x) for x in xs]
+        np.testing.assert_allclose(index.heights_at(xs), expected, rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose([index.height_at(x) for x in xs], expected, rtol=1e-9, atol=1e-9)
+        # Periodic lookups one turn around the planet away
+        np.testing.assert_allclose(index.heights_at(xs + planet.ground_length, periodic=True), expected,
+                                   rtol=1e-6, atol=1e-6)
+
+
+def test_cast_rays_matches_brute_force():
+    rng = np.random.default_rng(2)
+    max_distance = 1500.0
+    distances = np.linspace(0, max_distance, 30001)  # Scan resolution: 0.05 m
+    for seed in SEEDS:
+        index = Planet(rng=np.random.default_rng(seed)).terrain_index
+        for _ in range(20):
+            x0 = rng.uniform(index.x_start, index.x_start + index.period)
+            y0 = index.height_at(x0) + rng.uniform(1, 2000)
+            angles = rng.uniform(-np.pi, np.pi, 7)
+            hits = index.cast_rays(x0, y0, angles, max_distance)
+            for angle, hit in zip(angles, hits):
+                below = y0 + distances * np.sin(angle) <= index.heights_at(x0 + distances * np.cos(angle), periodic=True)
+                expected = distances[np.argmax(below)] if below.any() else max_distance
+                assert abs(hit - expected) <= 0.1
+
+
+def test_terrain_batch_matches_single_terrains():
+    indices = [Planet(rng=np.random.default_rng(seed)).terrain_index for seed in SEEDS]
+    batch = TerrainBatch(indices)
+    rng = np.random.default_rng(3)
+    x0 = np.array([index.x_start + rng.uniform(0, index.period) for index in indices])
+    y0 = np.array([index.max_height + rng.uniform(10, 500) for index in indices])
+    angles = rng.uniform(-np.pi, np.pi, (len(indices), 5))
+    expected_rays = [index.cast_rays(x, y, a, 1000.0) for index, x, y, a in zip(indices, x0, y0, angles)]
+    np.testing.assert_allclose(batch.cast_rays(x0[:, None], y0[:, None], angles, 1000.0), expected_rays)
+    expected_heights = [index.height_at(x) for index, x in zip(indices, x0)]
+    np.testing.assert_allclose(batch.heights_at(x0), expected_heights)
+
@@ -1,2 +1,40 @@
 # -*- coding: utf-8 -*-
 
+# tests/test_interactions.py
+
+import numpy as np
+import pytest
+
+from ai_models.basic_ai import BasicAI
+from ai_models.numpy_policy import NumpyPolicy
+from environments.scenarios import random_scenario
+from training.evaluate import run_episodes
+from utils.animation import Animation
+
+SEEDS = range(8)
+STATE_SIZE = 20  # BasicAI state vector with the default 5 terrain rays
+
+
+def random_policy(state_size, seed=0):
+    """Small random NumpyPolicy (no torch needed)."""
+    rng = np.random.default_rng(seed)
+    layers = [('linear', rng.normal(size=(state_size, 32)), rng.normal(size=32)), ('relu',),
+              ('linear', rng.normal(size=(32, 25)), rng.normal(size=25))]
+    return NumpyPolicy(layers, np.linspace(0, 1, 5), np.linspace(-15, 15, 5))
+
+
+@pytest.mark.parametrize('action_repeat', [1, 3])
+def test_run_episodes_matches_animation(action_repeat):
+    seeds = list(SEEDS)
+    policy = random_policy(STATE_SIZE)
+    results = run_episodes(policy, seeds, action_repeat=action_repeat)
+    for i, seed in enumerate(seeds):
+        planet, lander, start_position = random_scenario(np.random.default_rng(seed))
+        ai_model = BasicAI(lander, planet, action_repeat=action_repeat, policy=policy)
+        animation = Animation(lander, ai_model, planet, start_position, display=False, learn=False)
+        animation.run()
+        stats = animation.stats
+        assert results['steps'][i] == stats.steps
+        np.testing.assert_allclose(results['total_reward'][i], stats.total_reward, rtol=1e-6)
+        assert results['landed'][i] == lander.is_landed
+        assert results['crashed'][i] == lander.crashed
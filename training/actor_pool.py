@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+# training/actor_pool.py
+
+import multiprocessing as mp
+import os
+import queue
+import random
+
+import numpy as np
+import torch
+
+from ai_models.basic_ai import BasicAI
+from environments.scenarios import random_scenario
+from environments.scenario_bank import ScenarioBank
+from utils.animation import Animation
+from utils.trajectory import TrajectoryRecorder
+
+EPISODE_STEPS = 1000  # Frames of a default Animation (total_time / dt)
+
+
+def _actor_loop(worker_id, seed, policy_queue, episode_queue, stop_event, action_repeat=1, animation_options=None,
+                scenario_bank=None, scenario_index=0, scenario_stride=1, record_dir=None):
+    """
+    Worker process: run episodes with the latest policy received from the learner (no training),
+    and send the transitions of every episode back through episode_queue.
+    With a scenario bank (path), the worker plays scenarios scenario_index, scenario_index + scenario_stride, ...
+    of the memory-mapped bank, shared by all the workers.
+    With record_dir, the trajectories of the worker are recorded in record_dir/worker_<id> (episodes numbered per worker).
+    """
+    torch.set_num_threads(1)
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+    bank = ScenarioBank(scenario_bank) if scenario_bank else None
+    recorder = TrajectoryRecorder(os.path.join(record_dir, f'worker_{worker_id}')) if record_dir else None
+    num_episodes = 0
+    planet, lander, start_position = random_scenario()
+    ai_model = BasicAI(lander, planet, action_repeat=action_repeat, max_memory_size=EPISODE_STEPS)
+    dqn = ai_model.ai_model
+
+    loaded = False
+    while not stop_event.is_set():
+        # Switch to the most recent policy sent by the learner (wait for the first one)
+        latest = None
+        try:
+            if not loaded:
+                latest = policy_queue.get(timeout=0.1)
+            while True:
+                latest = policy_queue.get_nowait()
+        except queue.Empty:
+            pass
+        if latest is not None:
+            weights, dqn.epsilon = latest
+            dqn.model.load_state_dict({name: torch.from_numpy(value) for name, value in weights.items()})
+            loaded = True
+        if not loaded:
+            continue
+
+        # Run one episode on a random scenario (or the next one of the bank)
+        if bank:
+            planet, lander, start_position = bank.scenario(scenario_index)
+            scenario_index += scenario_stride
+        else:
+            planet, lander, start_position = random_scenario()
+        ai_model.lander = lander
+        ai_model.planet = planet
+        ai_model.prepare_for_landing()
+        dqn.memory.clear()
+        num_episodes += 1
+        animation = Animation(lander, ai_model, planet, start_position, display=False, learn=False,
+                              recorder=recorder, episode=num_episodes, **(animation_options or {}))
+        animation.run()
+        episode = (tuple(column.copy() for column in dqn.memory.transitions()), animation.stats)
+
+        # Hand the transitions over, waiting while the learner is behind
+        while not stop_event.is_set():
+            try:
+                episode_queue.put((worker_id, episode), timeout=0.1)
+                break
+            except queue.Full:
+                continue
+
+    if recorder is not None:
+        recorder.close()
+    # Do not wait at exit for undelivered episodes once the learner has stopped
+    episode_queue.cancel_join_thread()
+
+
+class ActorPool:
+    """
+    Pool of worker processes running episodes for a single learner.
+    Each worker holds its own copy of the policy, refreshed by broadcast(), and streams back the
+    transitions of its episodes as (states, actions, rewards, next_states, dones) arrays, with their EpisodeStats.
+    animation_options: extra Animation settings of the episodes (e.g. integrator).
+    scenario_bank: path of a ScenarioBank file, worker i playing its scenarios start_index + i, + num_workers, ...
+    record_dir: directory where the workers record their trajectories (see utils.trajectory).
+    """
+    def __init__(self, num_workers, seed=None, queue_size=None, action_repeat=1, animation_options=None,
+                 scenario_bank=None, start_index=0, record_dir=None):
+        context = mp.get_context('spawn')  # Fresh interpreters: safe with torch threads
+        self.stop_event = context.Event()
+        self.episode_queue = context.Queue(maxsize=queue_size or 2 * num_workers)
+        self.policy_queues = [context.Queue() for _ in range(num_workers)]
+        base_seed = random.randrange(2**31) if seed is None else seed
+        self.workers = [
+            context.Process(target=_actor_loop,
+                            args=(i, base_seed + i, policy_queue, self.episode_queue, self.stop_event, action_repeat,
+                                  animation_options, scenario_bank, start_index + i, num_workers, record_dir),
+                            daemon=True)
+            for i, policy_queue in enumerate(self.policy_queues)]
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def broadcast(self, model, epsilon):
+        """Send the current policy weights and exploration rate to every worker."""
+        weights = {name: value.detach().cpu().numpy().copy() for name, value in model.state_dict().items()}
+        for policy_queue in self.policy_queues:
+            policy_queue.put((weights, epsilon))
+
+    def get(self):
+        """Wait for the next finished episode, returns (worker_id, (transitions, stats))."""
+        while True:
+            try:
+                return self.episode_queue.get(timeout=1.0)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in self.workers):
+                    raise RuntimeError("All actor processes have exited")
+
+    def close(self):
+        """Stop the workers."""
+        self.stop_event.set()
+        for policy_queue in self.policy_queues:
+            policy_queue.cancel_join_thread()  # Pending policies are dropped
+        for worker in self.workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
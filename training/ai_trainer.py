@@ -2,16 +2,23 @@
 
 # training/ai_trainer.py
 
-import random
 import torch
 import re
-import csv
 import os
+import numpy as np
 
 from lander.lander import Lander
 from environments.planet import Planet
 from ai_models.basic_ai import BasicAI
 from utils.animation import Animation
+from environments.scenarios import random_scenario
+from environments.scenario_bank import ScenarioBank
+from training.actor_pool import ActorPool
+from training.schedule import TrainingSchedule
+from training.checkpoints import CheckpointManager
+from utils.data_logger import MetricsLogger
+from utils.trajectory import TrajectoryRecorder
+from training.data_collector import TransitionWriter, TransitionDataset, pretrain
 
 FUEL_DENSITY = 0.1
 MAX_THRUST = 2000
@@ -31,75 +38,155 @@ def get_latest_model(save_dir):
     latest_model = max(files, key=lambda x: int(re.search(r'\d+', x).group()))
     return os.path.join(save_dir, latest_model)
 
-def save_training_loss(epoch, reward, loss_file='training_loss.csv'):
-    """Append the total reward for the current epoch to the loss file."""
-    with open(loss_file, 'a') as f:
-        writer = csv.writer(f, delimiter=' ')
-        writer.writerow([epoch, reward])
-        
-def train_ai_model(num_episodes=10000, reset_model=False, save_interval=100, save_dir="ai_models/models_saved", loss_file='training_loss.csv'):
+def train_ai_model(num_episodes=10000, reset_model=False, save_interval=100, save_dir="ai_models/models_saved", loss_file='training_loss.csv',
+                   prioritized_replay=False, num_workers=0,
+                   train_every=1, gradient_steps=1, warmup_steps=0, target_sync_interval=None, action_repeat=1,
+                   keep_checkpoints=5, save_replay=False, metrics_dir='training_metrics',
+                   integrator='fixed', max_dt=1.0, scenario_bank=None, record_dir=None,
+                   dataset_dir=None, pretrain_dir=None, pretrain_epochs=1):
+    """
+    Train the DQN lander AI.
+    - num_workers: if > 0, episodes are run by that many actor processes while this process only learns.
+    - train_every, gradient_steps, warmup_steps, target_sync_interval: training schedule (see TrainingSchedule),
+      gradient_steps minibatches are replayed every train_every environment steps once warmup_steps
+      steps have been collected. The defaults replay one minibatch per step.
+    - action_repeat: physics steps each action of the AI is held for (one transition per action).
+    - keep_checkpoints, save_replay: every save_interval episodes a full checkpoint (see CheckpointManager)
+      is written in the background; only the keep_checkpoints latest are kept, with the replay memory if save_replay.
+    - metrics_dir: per-episode metrics log (see MetricsLogger), (episode, total reward) rows are also appended to loss_file.
+    - integrator, max_dt: physics integration of the episodes, 'fixed' (dt steps) or 'adaptive' (see Animation).
+    - scenario_bank: path of a ScenarioBank file; episode n then plays scenario n of the bank (reproducible runs)
+      instead of a freshly drawn random scenario.
+    - record_dir: record the trajectory of every episode there (see utils.trajectory, one subdirectory per actor).
+    - dataset_dir: append the transitions of every episode to this dataset (see TransitionWriter).
+    - pretrain_dir, pretrain_epochs: first train offline on the transitions of this dataset (see pretrain),
+      when starting a new run (not when resuming from a checkpoint).
+    """
     # Ensure the directory exists
     os.makedirs(save_dir, exist_ok=True)
    
     # Initialize the AI model (this should be done ONCE at the start, not every episode)
     planet = Planet()
     lander = Lander(max_thrust=1500, max_fuel=500, drag_coeff=0.5, mass=1000, surface_area=4.0)
-    ai_model = BasicAI(lander, planet)
+    ai_model = BasicAI(lander, planet, action_repeat=action_repeat, prioritized=prioritized_replay)
     ai_model.prepare_for_landing()
+    schedule = TrainingSchedule(train_every, gradient_steps, warmup_steps, target_sync_interval)
+    schedule.configure(ai_model.ai_model)
 
     start_episode = 0
+    checkpoints = CheckpointManager(save_dir, keep_last=keep_checkpoints, save_replay=save_replay)
     
-    # Check if a model already exists and load it
+    # Check if a checkpoint (or an older model file) already exists and load it
     if not reset_model:
-        latest_model = get_latest_model(save_dir)
-    
-        if latest_model:
-            # Extract the episode number from the file name
-            start_episode = int(re.search(r'\d+', latest_model).group())
-            print(f"Resuming from episode {start_episode + 1}")
-            ai_model.ai_model.load(latest_model)
-            print(f"Loading model from {latest_model}")
+        if checkpoints.latest():
+            extra = checkpoints.restore(ai_model.ai_model)
+            start_episode = extra['episode']
+            schedule.env_steps = extra.get('env_steps', 0)
+            print(f"Resuming from episode {start_episode + 1} (checkpoint {checkpoints.latest()['checkpoint']})")
+        else:
+            latest_model = get_latest_model(save_dir)
+        
+            if latest_model:
+                # Extract the episode number from the file name
+                start_episode = int(re.search(r'\d+', latest_model).group())
+                print(f"Resuming from episode {start_episode + 1}")
+                ai_model.ai_model.load(latest_model)
+                print(f"Loading model from {latest_model}")
     
+    if pretrain_dir and start_episode == 0:  # A resumed run has already been pretrained
+        dataset = TransitionDataset(pretrain_dir)
+        print(f"Pretraining on {len(dataset)} transitions from {pretrain_dir}")
+        pretrain(ai_model.ai_model, dataset, epochs=pretrain_epochs)
+
+    metrics = MetricsLogger(metrics_dir, csv_path=loss_file)
+    writer = TransitionWriter(dataset_dir, ai_model.state_size) if dataset_dir else None
+    animation_options = {'integrator': integrator, 'max_dt': max_dt}
+    try:
+        if num_workers > 0:
+            train_with_actors(ai_model, start_episode, num_episodes, num_workers, schedule,
+                              save_interval, checkpoints, metrics, animation_options, scenario_bank, record_dir, writer)
+        else:
+            bank = ScenarioBank(scenario_bank) if scenario_bank else None
+            recorder = TrajectoryRecorder(record_dir) if record_dir else None
+            try:
+                train_serial(ai_model, start_episode, num_episodes, schedule, save_interval, checkpoints, metrics,
+                             animation_options, bank, recorder, writer)
+            finally:
+                if recorder is not None:
+                    recorder.close()
+    finally:
+        if writer is not None:
+            writer.close()
+        metrics.close()
+        checkpoints.close()  # Wait for the last checkpoint to be written
+
+def checkpoint_extra(ai_model, schedule, animation_options):
+    """Training state saved with a checkpoint: schedule progress and the control settings the policy is trained with."""
+    return {'env_steps': schedule.env_steps, 'action_repeat': ai_model.action_repeat,
+            'integrator': animation_options['integrator']}
+
+def train_serial(ai_model, start_episode, num_episodes, schedule, save_interval, checkpoints, metrics, animation_options,
+                 bank=None, recorder=None, writer=None):
+    """Single-process training: episodes are run and learned from in this process."""
     for episode in range(start_episode, num_episodes):
-        # Create a random planet
-        planet = Planet()
-        # Set random start position
-        start_x = random.uniform(0, planet.ground_length)
-        start_y = planet.atmosphere_thickness
-        start_v = random.uniform(-10, 0)
-        start_t = 0
-        start_a = random.uniform(-90, 90)
-        start_position = (start_x, start_y, start_v, start_t, start_a)  # x, y, v, t, a
-
-        # Initialize the lander
-        max_thrust = random.uniform(500, 5000)
-        max_fuel = random.uniform(500, 5000)
-        drag_coeff = random.uniform(0.2, 0.8) 
-        surface_area = random.uniform(1.0, 10.0)    
-        
-        mass = max_fuel*FUEL_DENSITY + max_thrust/200
-        
-        lander = Lander(max_thrust=max_thrust, max_fuel=max_fuel, drag_coeff=drag_coeff, mass=mass, surface_area=surface_area)
-        lander.reset(start_position)
+        # Draw a random planet, lander and start position (or take the next one of the bank)
+        planet, lander, start_position = bank.scenario(episode) if bank else random_scenario()
         
         ai_model.lander = lander
         ai_model.planet = planet
         ai_model.prepare_for_landing()
 
         # Initialize the animation (set display=False for training)
-        animation = Animation(lander, ai_model, planet, start_position, display=False)
+        animation = Animation(lander, ai_model, planet, start_position, display=False, schedule=schedule,
+                              recorder=recorder, episode=episode + 1, **animation_options)
 
         # Run the simulation
+        memory = ai_model.ai_model.memory
+        added = memory.total_added
         animation.run()
+        if writer is not None:
+            # Transitions of the episode: the last ones added to the memory
+            added = memory.total_added - added
+            if added > memory.capacity:
+                raise ValueError(f"An episode of {added} transitions does not fit in the replay memory "
+                                 f"({memory.capacity}): they cannot all be written to the dataset")
+            slots = (memory.position - added + np.arange(added)) % memory.capacity
+            writer.add_batch(memory.states[slots], memory.actions[slots], memory.rewards[slots],
+                             memory.next_states[slots], memory.dones[slots])
 
         # At the end of the episode, print the results
-        total_reward = sum([experience[2] for experience in ai_model.ai_model.memory])  # Sum of rewards
-        print(f"Episode {episode+1}/{num_episodes}, Total Reward: {total_reward}, Epsilon: {ai_model.ai_model.epsilon}")
+        stats = animation.stats
+        print(f"Episode {episode+1}/{num_episodes}, Total Reward: {stats.total_reward}, Epsilon: {ai_model.ai_model.epsilon}")
 
-        # Save the total_reward in training_loss.csv
-        save_training_loss(episode + 1, total_reward, loss_file)
+        # Log the episode metrics (written in batches)
+        metrics.log(episode + 1, stats, ai_model.ai_model.epsilon)
         
-        # Optionally save the model every few episodes
+        # Optionally save a checkpoint every few episodes
         if (episode + 1) % save_interval == 0:
-            ai_model.ai_model.save(f"{save_dir}/ai_model_episode_{episode+1}.pth")
-        
+            checkpoints.save(episode + 1, ai_model.ai_model, extra=checkpoint_extra(ai_model, schedule, animation_options))
+
+def train_with_actors(ai_model, start_episode, num_episodes, num_workers, schedule, save_interval, checkpoints, metrics,
+                      animation_options, scenario_bank=None, record_dir=None, writer=None):
+    """Actor/learner training: worker processes run the episodes, this process owns the DQNAI and learns."""
+    dqn = ai_model.ai_model
+    pool = ActorPool(num_workers, action_repeat=ai_model.action_repeat, animation_options=animation_options,
+                     scenario_bank=scenario_bank, start_index=start_episode, record_dir=record_dir)
+    pool.start()
+    pool.broadcast(dqn.model, dqn.epsilon)
+    try:
+        for episode in range(start_episode, num_episodes):
+            worker_id, (transitions, stats) = pool.get()
+            dqn.memory.add_batch(*transitions)
+            if writer is not None:
+                writer.add_batch(*transitions)
+            schedule.train(dqn, len(transitions[2]))
+            # Send the updated policy back to the workers
+            pool.broadcast(dqn.model, dqn.epsilon)
+
+            print(f"Episode {episode+1}/{num_episodes}, Total Reward: {stats.total_reward}, Epsilon: {dqn.epsilon} (worker {worker_id})")
+            metrics.log(episode + 1, stats, dqn.epsilon)
+
+            if (episode + 1) % save_interval == 0:
+                checkpoints.save(episode + 1, dqn, extra=checkpoint_extra(ai_model, schedule, animation_options))
+    finally:
+        pool.close()
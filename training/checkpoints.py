@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+# training/checkpoints.py
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+import numpy as np
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def read_manifest(save_dir):
+    """Checkpoint entries listed in the manifest of save_dir, oldest first (empty list if there is none)."""
+    manifest_path = os.path.join(save_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return []
+    with open(manifest_path) as f:
+        return json.load(f)['checkpoints']
+
+
+class CheckpointManager:
+    """
+    Full training checkpoints of a DQNAI: model, target model, optimizer, epsilon, RNG states,
+    optionally the replay memory, and a small dict of extra training state.
+    - save() takes a snapshot on the calling thread (a copy, so training can go on) and hands it to a
+      background thread that writes the files; at most one snapshot waits, so memory stays bounded.
+    - Checkpoints are listed in save_dir/manifest.json (oldest first, with their extra dict), only the keep_last
+      most recent ones are kept on disk. The latest checkpoint is found from the manifest without scanning the directory.
+    Files of a checkpoint: ai_model_episode_<n>.ckpt (torch), ai_model_episode_<n>.npz (NumpyPolicy export),
+    ai_model_episode_<n>.replay.npz (replay memory, if save_replay).
+    """
+    def __init__(self, save_dir, keep_last=5, save_replay=False):
+        self.save_dir = save_dir
+        self.keep_last = keep_last
+        self.save_replay = save_replay
+        self.manifest_path = os.path.join(save_dir, MANIFEST_NAME)
+        os.makedirs(save_dir, exist_ok=True)
+        self.entries = self.read_manifest()
+        self._pending = queue.Queue(maxsize=1)
+        self._error = None
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def read_manifest(self):
+        """Checkpoint entries listed in the manifest (empty list if there is none)."""
+        return read_manifest(self.save_dir)
+
+    def latest(self):
+        """Manifest entry of the most recent checkpoint, or None."""
+        return self.entries[-1] if self.entries else None
+
+    def save(self, episode, dqn, extra=None):
+        """Snapshot the training state after the given episode and queue it for writing."""
+        import torch  # Imported here: reading the manifest does not need torch
+        self._raise_error()
+        snapshot = {'episode': episode,
+                    'dqn': dqn.training_state(),
+                    'rng': {'python': random.getstate(),
+                            'numpy': np.random.get_state(),
+                            'torch': torch.get_rng_state()},
+                    'extra': dict(extra or {})}
+        policy = dqn.export_policy()
+        replay = dqn.memory.state_dict() if self.save_replay else None
+        self._pending.put((snapshot, policy, replay))  # Blocks while the previous snapshot is being written
+
+    def wait(self):
+        """Block until every queued checkpoint is written."""
+        self._pending.join()
+        self._raise_error()
+
+    def close(self):
+        self.wait()
+        self._pending.put(None)
+        self._writer.join()
+
+    def restore(self, dqn, entry=None):
+        """
+        Load a checkpoint (the latest one by default) into dqn and the global RNGs.
+        Returns the extra dict, with the episode number under 'episode'.
+        """
+        import torch
+        entry = entry or self.latest()
+        # Our own files: they hold RNG states and optimizer data, not only tensors
+        snapshot = torch.load(os.path.join(self.save_dir, entry['checkpoint']), weights_only=False)
+        dqn.load_training_state(snapshot['dqn'])
+        random.setstate(snapshot['rng']['python'])
+        np.random.set_state(snapshot['rng']['numpy'])
+        torch.set_rng_state(snapshot['rng']['torch'])
+        if entry.get('replay'):
+            with np.load(os.path.join(self.save_dir, entry['replay'])) as data:
+                dqn.memory.load_state_dict(dict(data))
+        return dict(snapshot['extra'], episode=snapshot['episode'])
+
+    def _write_loop(self):
+        while True:
+            item = self._pending.get()
+            try:
+                if item is None:
+                    return
+                if self._error is None:
+                    self._write(*item)
+            except Exception as error:  # Reported to the training thread by the next save/wait
+                self._error = error
+            finally:
+                self._pending.task_done()
+
+    def _write(self, snapshot, policy, replay):
+        import torch
+        stem = f"ai_model_episode_{snapshot['episode']}"
+        entry = {'episode': snapshot['episode'], 'time': time.time(),
+                 'checkpoint': stem + '.ckpt', 'policy': stem + '.npz', 'replay': None,
+                 'extra': snapshot['extra']}
+        _atomic_write(os.path.join(self.save_dir, entry['checkpoint']), lambda f: torch.save(snapshot, f))
+        _atomic_write(os.path.join(self.save_dir, entry['policy']), policy.save)
+        if replay is not None:
+            entry['replay'] = stem + '.replay.npz'
+            _atomic_write(os.path.join(self.save_dir, entry['replay']), lambda f: np.savez(f, **replay))
+
+        # Add the new checkpoint to the manifest, then drop the oldest ones
+        entries = [e for e in self.entries if e['episode'] != entry['episode']] + [entry]
+        expired = entries[:-self.keep_last] if self.keep_last else []
+        entries = entries[len(expired):]
+        _atomic_write(self.manifest_path, lambda f: f.write(json.dumps({'checkpoints': entries}, indent=1).encode()))
+        self.entries = entries
+        for old in expired:
+            for key in ('checkpoint', 'policy', 'replay'):
+                if old.get(key):
+                    try:
+                        os.remove(os.path.join(self.save_dir, old[key]))
+                    except FileNotFoundError:
+                        pass
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError("Writing a checkpoint failed") from error
+
+
+def _atomic_write(path, write):
+    """Write a file through a temporary file in the same directory, renamed once complete."""
+    tmp_path = os.path.join(os.path.dirname(path), '.tmp-' + os.path.basename(path))
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
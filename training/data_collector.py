@@ -1,5 +1,16 @@
 # -*- coding: utf-8 -*-
 
+# training/data_collector.py
+
+import glob
+import json
+import os
+
+import numpy as np
+
+SHARD_SIZE = 1 << 18  # Transitions per shard (~44 MB with the default 20-entry states)
+
+
 def collect_training_data(lander, planet, frame_data):
     # Extract and store relevant data
     frame_data.append({
@@ -9,5 +20,158 @@ def collect_training_data(lander, planet, frame_data):
         'thrust': lander.thrust,
         'angle': lander.angle,
         'gravity': planet.gravity_constant,
-        'air_density': planet.get_air_density(lander.position[1])
+        'air_density': planet.atmosphere_density(lander.position[1])
     })
+
+
+def transition_columns(state_size):
+    """(name, dtype, shape) of the columns of a transition dataset (same layout as the ReplayBuffer arrays)."""
+    return (('states', np.float32, (state_size,)),
+            ('actions', np.int16, ()),  # Flat action index, widened to int64 for gather when loaded
+            ('rewards', np.float32, ()),
+            ('next_states', np.float32, (state_size,)),
+            ('dones', np.float32, ()))
+
+
+class TransitionWriter:
+    """
+    Streaming writer of (state, action, reward, next_state, done) transitions to a sharded columnar dataset:
+    <directory>/shard_<n>.<column>.npy, one fixed-dtype file per column and shard (see transition_columns),
+    read back with TransitionDataset. Transitions are buffered in preallocated arrays and a shard is written
+    every shard_size transitions (the last, partial one on close()). A writer opened on an existing
+    dataset appends new shards.
+    """
+    def __init__(self, directory, state_size, shard_size=SHARD_SIZE):
+        self.directory = directory
+        self.state_size = state_size
+        self.shard_size = shard_size
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, 'dataset.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                if json.load(f)['state_size'] != state_size:
+                    raise ValueError(f"{directory} holds transitions of another state size")
+        else:
+            with open(meta_path, 'w') as f:
+                json.dump({'state_size': state_size}, f)
+        self.shard = len(glob.glob(os.path.join(directory, 'shard_*.rewards.npy')))
+        self.buffers = {name: np.zeros((shard_size,) + shape, dtype=dtype)
+                        for name, dtype, shape in transition_columns(state_size)}
+        self.count = 0  # Buffered transitions
+
+    def add(self, state, action, reward, next_state, done):
+        """Append one transition."""
+        self.add_batch([state], [action], [reward], [next_state], [done])
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        """Append a batch of transitions (arrays, as returned by ReplayBuffer.transitions)."""
+        columns = {'states': states, 'actions': actions, 'rewards': rewards, 'next_states': next_states, 'dones': dones}
+        n = len(rewards)
+        start = 0
+        while start < n:
+            size = min(n - start, self.shard_size - self.count)
+            for name, buffer in self.buffers.items():
+                buffer[self.count:self.count + size] = columns[name][start:start + size]
+            self.count += size
+            start += size
+            if self.count == self.shard_size:
+                self.flush()
+
+    def flush(self):
+        """Write the buffered transitions as a new shard."""
+        if not self.count:
+            return
+        # The rewards column is written last: a shard is complete once it exists (see TransitionDataset)
+        for name in ('states', 'actions', 'next_states', 'dones', 'rewards'):
+            np.save(os.path.join(self.directory, f'shard_{self.shard:05d}.{name}.npy'), self.buffers[name][:self.count])
+        self.shard += 1
+        self.count = 0
+
+    def close(self):
+        self.flush()
+
+
+class TransitionDataset:
+    """
+    Memory-mapped view of the shards written by TransitionWriter.
+    batches() streams shuffled minibatches: shards are visited in random order, each one is read
+    sequentially in one go and its transitions are shuffled in memory, so memory use is one shard
+    and the disk is only read sequentially, however large the dataset.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'dataset.json')) as f:
+            self.state_size = json.load(f)['state_size']
+        self.shards = []
+        for path in sorted(glob.glob(os.path.join(directory, 'shard_*.rewards.npy'))):
+            prefix = path[:-len('rewards.npy')]
+            self.shards.append({name: np.load(prefix + name + '.npy', mmap_mode='r')
+                                for name, _, _ in transition_columns(self.state_size)})
+
+    def __len__(self):
+        return sum(len(shard['rewards']) for shard in self.shards)
+
+    def batches(self, batch_size, shuffle=True, rng=None, drop_last=True):
+        """
+        Yield minibatches (states, actions, rewards, next_states, dones) as numpy arrays
+        (actions as int64 indices), covering the dataset once. The transitions left over at the end of a
+        shard are completed with the next shard, so only the last minibatch of the pass can be short
+        (dropped if drop_last).
+        """
+        rng = np.random.default_rng(rng)
+        order = rng.permutation(len(self.shards)) if shuffle else range(len(self.shards))
+        names = [name for name, _, _ in transition_columns(self.state_size)]
+        leftover = None  # Transitions of the previous shards not yet in a minibatch
+        for shard_index in order:
+            shard = self.shards[shard_index]
+            columns = [np.array(shard[name]) for name in names]  # Sequential read
+            if shuffle:
+                permutation = rng.permutation(len(columns[0]))
+                columns = [column[permutation] for column in columns]
+            n = len(columns[0])
+            start = 0
+            if leftover is not None:
+                # Complete the minibatch started at the end of the previous shards
+                start = min(batch_size - len(leftover[0]), n)
+                leftover = [np.concatenate((old, column[:start])) for old, column in zip(leftover, columns)]
+                if len(leftover[0]) < batch_size:
+                    continue
+                yield _batch(leftover)
+            end = start + (n - start) // batch_size * batch_size
+            for i in range(start, end, batch_size):
+                yield _batch(column[i:i + batch_size] for column in columns)
+            leftover = [column[end:] for column in columns]
+        if leftover is not None and len(leftover[0]) and not drop_last:
+            yield _batch(leftover)
+
+
+def _batch(columns):
+    states, actions, rewards, next_states, dones = columns
+    return states, actions.astype(np.int64), rewards, next_states, dones
+
+
+def pretrain(dqn, dataset, epochs=1, batch_size=None, seed=None, log_interval=1000):
+    """
+    Train a DQNAI offline on the transitions of a TransitionDataset (no simulation):
+    epochs passes over the dataset in shuffled minibatches of batch_size (default: dqn.batch_size).
+    Returns the mean absolute TD error of every epoch.
+    The exploration rate of dqn is left as it was: the offline gradient steps do not use up the
+    epsilon decay of the online episodes.
+    """
+    import torch  # Only needed here: writing and reading datasets does not need torch
+    rng = np.random.default_rng(seed)
+    batch_size = batch_size or dqn.batch_size
+    epsilon = dqn.epsilon  # DQNAI.learn decays it at every gradient step
+    history = []
+    for epoch in range(epochs):
+        total, count = 0.0, 0
+        for batch in dataset.batches(batch_size, rng=rng):
+            td_errors = dqn.learn(*(torch.from_numpy(column) for column in batch))
+            total += float(np.abs(td_errors).mean())
+            count += 1
+            if log_interval and count % log_interval == 0:
+                print(f"Epoch {epoch + 1}/{epochs}, batch {count}, mean |TD error|: {total / count:.4f}")
+        history.append(total / max(count, 1))
+        print(f"Epoch {epoch + 1}/{epochs} done, mean |TD error|: {history[-1]:.4f}")
+    dqn.epsilon = epsilon
+    return history
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+
+# training/evaluate.py
+
+import json
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ai_models.numpy_policy import NumpyPolicy
+from environments.lander_env import LanderVecEnv
+from environments.scenario_bank import ScenarioBank
+from training.checkpoints import read_manifest
+from utils.data_logger import FLYING, LANDED, CRASHED
+from utils.trajectory import TrajectoryRecorder
+
+CHUNK_SIZE = 256  # Episodes stepped together by one task (fixed: results do not depend on the number of workers)
+PERCENTILES = (50, 90, 99)
+
+
+def load_policy(path):
+    """
+    Greedy policy of a saved model: a NumpyPolicy export (.npz), a training checkpoint (.ckpt,
+    see CheckpointManager) or a torch DQNAI model (.pth).
+    """
+    if path.endswith('.npz'):
+        return NumpyPolicy.load(path)
+    import torch
+    from ai_models.dqn_ai import DQNAI
+    if path.endswith('.ckpt'):
+        # Our own checkpoint files: they hold RNG states and optimizer data, not only tensors
+        weights = torch.load(path, weights_only=False)['dqn']['model']
+    else:
+        weights = torch.load(path, weights_only=True)
+    state_size = next(iter(weights.values())).shape[1]  # Input size of the first layer
+    dqn = DQNAI(None, None, state_size, 2)
+    dqn.model.load_state_dict(weights)
+    return dqn.export_policy()
+
+
+def policy_settings(path):
+    """
+    Control settings a saved model was trained with: {'action_repeat', 'integrator'}, from the checkpoint
+    manifest of its directory (or from the checkpoint itself). Models saved without them get the defaults.
+    """
+    settings = {'action_repeat': 1, 'integrator': 'fixed'}
+    name = os.path.basename(path)
+    entries = [e for e in read_manifest(os.path.dirname(path)) if name in (e['checkpoint'], e.get('policy'))]
+    if entries:
+        extra = entries[-1].get('extra', {})
+    elif path.endswith('.ckpt'):
+        import torch
+        extra = torch.load(path, weights_only=False)['extra']
+    else:
+        extra = {}
+    settings.update((key, extra[key]) for key in settings if key in extra)
+    return settings
+
+
+def find_latest_policy(save_dir):
+    """
+    Latest saved model of save_dir: the policy export (or else the checkpoint) of the latest entry of the
+    checkpoint manifest, or for older runs without a manifest the latest torch model (see get_latest_model).
+    """
+    entries = read_manifest(save_dir)
+    if entries:
+        latest = entries[-1]
+        name = latest['policy'] if latest.get('policy') and os.path.exists(os.path.join(save_dir, latest['policy'])) \
+            else latest['checkpoint']
+        return os.path.join(save_dir, name)
+    from training.ai_trainer import get_latest_model
+    return get_latest_model(save_dir) if os.path.isdir(save_dir) else None
+
+
+def run_episodes(policy, seeds, total_time=100, dt=0.1, recorder=None, first_episode=0, scenario_bank=None,
+                 action_repeat=1):
+    """
+    Fly the greedy policy (no exploration, no learning) on the scenarios drawn from the given seeds,
+    all stepped together in a LanderVecEnv. Returns per-episode arrays (see evaluate_policy).
+    recorder: optional TrajectoryRecorder, the episodes are recorded as first_episode, first_episode + 1...
+    scenario_bank: path of a ScenarioBank file, the seeds are then indices of its scenarios.
+    action_repeat: env steps each action is held for (as in training, see BasicAI).
+    """
+    bank = ScenarioBank(scenario_bank) if scenario_bank else None
+    env = LanderVecEnv(len(seeds), total_time=total_time, dt=dt, autoreset=False, scenario_bank=bank)
+    observations = env.reset(seeds)
+    landers = env.landers
+    start_fuel = landers.fuel.copy()
+    results = {'seed': np.asarray(seeds, dtype=np.int64),
+               'landed': np.zeros(len(seeds), dtype=bool),
+               'crashed': np.zeros(len(seeds), dtype=bool),
+               'steps': np.zeros(len(seeds), dtype=np.int64),
+               'touchdown_speed': np.full(len(seeds), np.nan),
+               'fuel_used': np.zeros(len(seeds)),
+               'total_reward': np.zeros(len(seeds))}
+    running = np.ones(len(seeds), dtype=bool)
+    history = []  # Per-step columns of all the episodes, when recording
+    step = 0
+    while running.any():
+        if step % action_repeat == 0:
+            # Decision point (all the episodes started together)
+            actions = policy.act_batch(observations)
+            observations, rewards, dones, info = env.step(actions)
+        else:
+            observations, rewards, dones, info = env.step(None)
+        step += 1
+        if recorder is not None:
+            history.append({'x': landers.x.copy(), 'y': landers.y.copy(), 'vx': landers.vx.copy(),
+                            'vy': landers.vy.copy(), 'angle': landers.angle.copy(), 'fuel': landers.fuel.copy(),
+                            'thrust': landers.thrust.copy(), 'thrust_idx': actions // len(env.angle_bins),
+                            'angle_idx': actions % len(env.angle_bins), 'reward': rewards,
+                            'distance_reward': info['distance_reward'],
+                            'vertical_speed_penalty': info['vertical_speed_penalty'],
+                            'horizontal_speed_penalty': info['horizontal_speed_penalty'],
+                            'fuel_penalty': info['fuel_penalty']})
+        results['total_reward'] += rewards * running
+        ended = dones & running
+        if ended.any():
+            results['landed'][ended] = info['landed'][ended]
+            results['crashed'][ended] = info['crashed'][ended]
+            results['steps'][ended] = info['steps'][ended]
+            results['fuel_used'][ended] = start_fuel[ended] - landers.fuel[ended]
+            touchdown = ended & (info['landed'] | info['crashed'])
+            results['touchdown_speed'][touchdown] = np.hypot(landers.vx[touchdown], landers.vy[touchdown])
+            running &= ~ended
+    if recorder is not None:
+        _record_episodes(recorder, env, results, history, dt, first_episode)
+    return results
+
+
+def _record_episodes(recorder, env, results, history, dt, first_episode):
+    columns = {name: np.array([step[name] for step in history]) for name in history[0]}  # (steps, episodes)
+    outcomes = np.where(results['landed'], LANDED, np.where(results['crashed'], CRASHED, FLYING))
+    for i, planet in enumerate(env.planets.planets):  # The planets the episodes were flown on
+        length = results['steps'][i]
+        steps = {name: column[:length, i] for name, column in columns.items()}
+        steps['time'] = np.arange(1, length + 1) * dt
+        recorder.add_episode(first_episode + i, planet, steps, outcomes[i])
+
+
+def _run_chunk(args):
+    policy, seeds, total_time, dt, record_dir, first_episode, scenario_bank, action_repeat = args
+    if record_dir is None:
+        return run_episodes(policy, seeds, total_time, dt, scenario_bank=scenario_bank, action_repeat=action_repeat)
+    recorder = TrajectoryRecorder(os.path.join(record_dir, f'chunk_{first_episode // CHUNK_SIZE:05d}'))
+    try:
+        return run_episodes(policy, seeds, total_time, dt, recorder, first_episode, scenario_bank, action_repeat)
+    finally:
+        recorder.close()
+
+
+def evaluate_policy(policy, num_episodes=1000, seed=0, num_workers=0, total_time=100, dt=0.1, record_dir=None,
+                    scenario_bank=None, action_repeat=1):
+    """
+    Evaluate a greedy policy on num_episodes seeded random scenarios (or scenarios of a bank).
+    The scenario seeds are drawn from `seed`, so the same call always plays the same episodes with the
+    same results, whatever the number of worker processes (num_workers=0: this process only).
+    Returns per-episode arrays: seed, landed, crashed, steps, touchdown_speed (NaN if the episode timed out),
+    fuel_used (percent of the tank) and total_reward.
+    record_dir: also record the trajectories of the episodes there (see utils.trajectory), numbered 0, 1, ...
+    scenario_bank: path of a ScenarioBank file (memory-mapped by every worker): the episodes play distinct
+    scenarios of the bank, drawn from `seed`, and the 'seed' array holds their bank indices.
+    action_repeat: physics steps each action is held for (the setting the policy was trained with).
+    """
+    rng = np.random.default_rng(seed)
+    if scenario_bank:
+        size = len(ScenarioBank(scenario_bank))
+        seeds = rng.choice(size, size=num_episodes, replace=num_episodes > size)
+    else:
+        seeds = rng.integers(2**63, size=num_episodes)
+    tasks = [(policy, seeds[start:start + CHUNK_SIZE], total_time, dt, record_dir, start, scenario_bank, action_repeat)
+             for start in range(0, num_episodes, CHUNK_SIZE)]
+    if num_workers > 0:
+        with ProcessPoolExecutor(num_workers, mp_context=mp.get_context('spawn')) as pool:
+            chunks = list(pool.map(_run_chunk, tasks))
+    else:
+        chunks = [_run_chunk(task) for task in tasks]
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+
+
+def summarize(results):
+    """Outcome statistics of evaluate_policy results."""
+    landed, crashed = results['landed'], results['crashed']
+    speeds = results['touchdown_speed'][landed | crashed]
+    landing_steps = results['steps'][landed]
+    summary = {'episodes': len(landed),
+               'landing_rate': float(landed.mean()),
+               'crash_rate': float(crashed.mean()),
+               'timeout_rate': float(1 - landed.mean() - crashed.mean()),
+               'mean_reward': float(results['total_reward'].mean()),
+               'mean_fuel_used': float(results['fuel_used'].mean()),
+               'mean_steps_to_land': float(landing_steps.mean()) if len(landing_steps) else None}
+    for q in PERCENTILES:
+        summary[f'touchdown_speed_p{q}'] = float(np.percentile(speeds, q)) if len(speeds) else None
+    return summary
+
+
+def format_summary(summary):
+    """Text report of summarize()."""
+    lines = [f"{'episodes':<24}{summary['episodes']}",
+             f"{'landed':<24}{100 * summary['landing_rate']:.1f} %",
+             f"{'crashed':<24}{100 * summary['crash_rate']:.1f} %",
+             f"{'timed out':<24}{100 * summary['timeout_rate']:.1f} %"]
+    for q in PERCENTILES:
+        value = summary[f'touchdown_speed_p{q}']
+        lines.append(f"{f'touchdown speed p{q}':<24}" + ('-' if value is None else f"{value:.2f} m/s"))
+    steps = summary['mean_steps_to_land']
+    lines.append(f"{'steps to land (mean)':<24}" + ('-' if steps is None else f"{steps:.1f}"))
+    lines.append(f"{'fuel used (mean)':<24}{summary['mean_fuel_used']:.2f} %")
+    lines.append(f"{'reward (mean)':<24}{summary['mean_reward']:.1f}")
+    return "\n".join(lines)
+
+
+def evaluate_checkpoint(path=None, save_dir="ai_models/models_saved", num_episodes=1000, seed=0, num_workers=0,
+                        output=None, record_dir=None, scenario_bank=None):
+    """
+    Evaluate a saved model (by default the latest one of save_dir), print the report and
+    optionally write the summary to `output` (JSON). Returns the summary.
+    scenario_bank: evaluate on scenarios of this ScenarioBank file instead of random ones.
+    The policy is flown with the action repeat it was trained with (see policy_settings).
+    """
+    path = path or find_latest_policy(save_dir)
+    if path is None:
+        raise FileNotFoundError(f"No saved model in {save_dir}")
+    settings = policy_settings(path)
+    if settings['integrator'] != 'fixed':
+        # The batched evaluation steps the physics by dt only
+        raise ValueError(f"{path} was trained with the {settings['integrator']} integrator, "
+                         f"evaluation only supports the fixed one")
+    summary = summarize(evaluate_policy(load_policy(path), num_episodes, seed, num_workers, record_dir=record_dir,
+                                        scenario_bank=scenario_bank, action_repeat=settings['action_repeat']))
+    summary['model'] = os.path.basename(path)
+    summary['seed'] = seed
+    summary['scenario_bank'] = scenario_bank
+    summary['action_repeat'] = settings['action_repeat']
+    print(f"Evaluation of {path} ({num_episodes} episodes, seed {seed}"
+          + (f", scenarios of {scenario_bank})" if scenario_bank else ")"))
+    print(format_summary(summary))
+    if output:
+        with open(output, 'w') as f:
+            json.dump(summary, f, indent=1)
+    return summary
@@ -2,6 +2,8 @@
 
 # training/reward_functions.py
 
+import numpy as np
+
 def compute_reward(lander, landing_zone, prev_dx, prev_dy, prev_fuel):
     # Distance to landing zone at current time step
     landing_x_center = (landing_zone[0][0] + landing_zone[1][0]) / 2
@@ -51,3 +53,30 @@ def compute_reward(lander, landing_zone, prev_dx, prev_dy, prev_fuel):
         total_reward += 50  # Small bonus for good proximity
 
     return total_reward, distance_reward, vertical_speed_penalty, horizontal_speed_penalty, fuel_penalty, current_dx, current_dy, lander.fuel
+
+def compute_reward_batch(landers, landing_zone, prev_dx, prev_dy, prev_fuel):
+    """
+    Vectorized compute_reward for a LanderBatch (landing_zone and the prev_* values being arrays, one per lander).
+    Returns the same tuple as compute_reward, made of arrays.
+    """
+    landing_x_center = (landing_zone[0][0] + landing_zone[1][0]) / 2
+    landing_y_center = landing_zone[0][1]
+    current_dx = np.abs(landers.x - landing_x_center)
+    current_dy = landers.y - landing_y_center
+
+    vertical_speed = np.abs(landers.vy)
+    horizontal_speed = np.abs(landers.vx)
+    fuel_used_step = (prev_fuel - landers.fuel)*landers.max_fuel
+
+    distance_reward = (prev_dx - current_dx) * 1.0 + (prev_dy - current_dy) * 1.0
+    vertical_speed_penalty = -vertical_speed * 0.05
+    horizontal_speed_penalty = -horizontal_speed * 0.02
+    fuel_penalty = -fuel_used_step*0.01
+
+    total_reward = distance_reward + vertical_speed_penalty + horizontal_speed_penalty + fuel_penalty
+    landing_reward = total_reward + 1000 - vertical_speed * 10 - (100 - landers.fuel)*landers.max_fuel* 0.5
+    total_reward = np.where(landers.is_landed, landing_reward,
+                            np.where(landers.crashed, -1000.0, total_reward - 1))
+    total_reward += 50 * ((current_dx < 10) & (current_dy < 10))
+
+    return total_reward, distance_reward, vertical_speed_penalty, horizontal_speed_penalty, fuel_penalty, current_dx, current_dy, landers.fuel.copy()
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+# training/schedule.py
+
+
+class TrainingSchedule:
+    """
+    Update-to-data schedule of the learner: when, and how much, to train relative to the environment steps.
+    - train_every: environment steps between two learner updates
+    - gradient_steps: gradient steps (replayed minibatches) per learner update
+    - warmup_steps: environment steps collected before the first update
+    - target_sync_interval: gradient steps between target network syncs (None: keep the model setting)
+    The default schedule trains once per environment step, as before.
+    The step counter persists across episodes, so one schedule is shared by a whole training run.
+    """
+    def __init__(self, train_every=1, gradient_steps=1, warmup_steps=0, target_sync_interval=None):
+        if train_every < 1 or gradient_steps < 0 or warmup_steps < 0:
+            raise ValueError("train_every must be >= 1, gradient_steps and warmup_steps >= 0")
+        self.train_every = train_every
+        self.gradient_steps = gradient_steps
+        self.warmup_steps = warmup_steps
+        self.target_sync_interval = target_sync_interval
+        self.env_steps = 0  # Environment steps seen so far
+
+    def step(self, num_steps=1):
+        """Record num_steps new environment steps, returns the number of gradient steps due now."""
+        previous = max(self.env_steps, self.warmup_steps)
+        self.env_steps += num_steps
+        if self.env_steps <= self.warmup_steps:
+            return 0
+        updates = self.env_steps // self.train_every - previous // self.train_every
+        return updates * self.gradient_steps
+
+    def configure(self, dqn):
+        """Apply the target sync interval to a DQNAI."""
+        if self.target_sync_interval is not None:
+            dqn.target_update_interval = self.target_sync_interval
+
+    def train(self, dqn, num_steps=1):
+        """Record num_steps environment steps and run the gradient steps due on the DQNAI."""
+        for _ in range(self.step(num_steps)):
+            dqn.replay()
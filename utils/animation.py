@@ -1,15 +1,17 @@
 # utils/animation.py
 
+import itertools
 import logging
-import matplotlib.pyplot as plt
 
-from environments.physics import update_lander_state
-from matplotlib.animation import FuncAnimation
+from environments.physics import LanderStepper
 from training.reward_functions import compute_reward
+from training.schedule import TrainingSchedule
+from utils.data_logger import EpisodeStats
 
 
 class Animation:
-    def __init__(self, lander, ai_model, planet, start_position, total_time=100, dt=0.1, display=True):
+    def __init__(self, lander, ai_model, planet, start_position, total_time=100, dt=0.1, display=True, learn=True, schedule=None,
+                 integrator='fixed', max_dt=1.0, recorder=None, episode=0, time_warp=1, interval=100):
         self.lander = lander
         self.ai_model = ai_model
         self.planet = planet
@@ -17,9 +19,35 @@ class Animation:
         self.total_time = total_time
         self.dt = dt
         self.display = display  # Controls whether display is enabled or not
+        self.learn = learn  # Train the AI model (replay) during the run
+        self.schedule = schedule or TrainingSchedule()  # When to replay (default: every frame)
         self.ani = None  # Placeholder for animation object if used
         self.fig = None
         self.ax = None
+        if time_warp < 1:
+            raise ValueError(f"time_warp must be at least 1, got {time_warp}")
+        self.time_warp = time_warp  # Physics frames simulated per rendered frame
+        self.interval = interval  # Delay between rendered frames (ms) of the live display
+        self._frame_iter = None  # Physics frames left to simulate (display and export)
+        self._over = False  # The displayed episode is over
+        self.stepper = None  # Scalar physics kernel, built in run() once the lander is reset
+        self.num_frames = int(total_time / dt)
+        # 'fixed': steps of dt; 'adaptive': steps of up to max_dt high above the terrain, dt near the ground,
+        # with the touchdown instant located exactly (one AI decision per step, see LanderStepper.step_adaptive)
+        if integrator not in ('fixed', 'adaptive'):
+            raise ValueError(f"Unknown integrator: {integrator}")
+        self.integrator = integrator
+        self.max_dt = max_dt
+        self.time = 0.0  # Simulated time
+        self.recorder = recorder  # Optional TrajectoryRecorder (utils.trajectory) saving every step of the run
+        self.episode = episode  # Episode number given to the recorder
+        # Action in progress (held for ai_model.action_repeat frames)
+        self.state = None
+        self.next_state = None  # State at the end of the last action, reused at the next decision point
+        self.action = None
+        self.action_reward = 0
+        self.action_steps = 0
+        self.stats = EpisodeStats()  # Statistics of the episode (return, reward components, outcome...)
         
         # Initialize previous distances to target at the start of the episode
         self.prev_dx = min(abs(self.lander.position[0] - self.ai_model.landing_x_center),
@@ -29,19 +57,28 @@ class Animation:
         self.prev_fuel = 100
         
     def update(self, frame):
-        # Get the current state
-        state = self.ai_model.get_state_vector()
-        # AI controls the lander
-        thrust, angle_change, thrust_idx, angle_idx = self.ai_model.control()
-        logging.info(f"Frame {frame}: Thrust = {thrust}, Angle Change = {angle_change}")
+        if self.action_steps == 0:
+            # Decision point: get the current state (the next state of the previous action) and let the AI choose an action
+            self.state = self.next_state if self.next_state is not None else self.ai_model.get_state_vector()
+            thrust, angle_change, thrust_idx, angle_idx = self.ai_model.control(self.state)
+            self.action = (thrust_idx, angle_idx)
+            self.action_reward = 0
+            logging.info("Frame %s: Thrust = %s, Angle Change = %s", frame, thrust, angle_change)
+        else:
+            # Frame skip: hold the last action
+            self.ai_model.hold()
 
         # Update the lander physics
-        update_lander_state(self.lander, self.planet, self.dt)
-        logging.info(f"Frame {frame}: Position: {self.lander.position}, Velocity: {self.lander.velocity}, Fuel: {self.lander.fuel}")
+        if self.integrator == 'adaptive':
+            remaining = self.total_time - self.time
+            self.time += self.stepper.step_adaptive(min(self.dt, remaining), min(self.max_dt, remaining))
+        else:
+            self.stepper.step(self.dt)
+            self.time = (frame + 1) * self.dt
+        self.action_steps += 1
+        logging.info("Frame %s: Position: %s, Velocity: %s, Fuel: %s",
+                     frame, self.lander.position, self.lander.velocity, self.lander.fuel)
 
-        # Get the next state
-        next_state = self.ai_model.get_state_vector()
-        
         # Compute reward
         r1, r2, r3, r4, r5, r6, r7, r8 = compute_reward( 
              self.lander, self.planet.landing_zone, self.prev_dx, self.prev_dy, self.prev_fuel)
@@ -53,35 +90,88 @@ class Animation:
         self.prev_dx = r6
         self.prev_dy = r7
         self.prev_fuel = r8
+        self.action_reward += reward  # Reward accumulated over the repeated action
+        self.stats.add(reward, distance_reward, v_speed_penalty, h_speed_penalty, fuel_penalty)
+        if self.recorder is not None:
+            self.recorder.record(self.time, self.lander, *self.action,
+                                 reward, distance_reward, v_speed_penalty, h_speed_penalty, fuel_penalty)
 
         done = self.lander.crashed or self.lander.is_landed
         
         # Log individual reward components
-        logging.info(f"Frame {frame}: Total Reward = {reward}, "
-                     f"Distance Reward = {distance_reward}, "
-                     f"Vertical Speed Penalty = {v_speed_penalty}, "
-                     f"Horizontal Speed Penalty = {h_speed_penalty}, "
-                     f"Fuel Penalty = {fuel_penalty}")
+        logging.info("Frame %s: Total Reward = %s, "
+                     "Distance Reward = %s, "
+                     "Vertical Speed Penalty = %s, "
+                     "Horizontal Speed Penalty = %s, "
+                     "Fuel Penalty = %s",
+                     frame, reward, distance_reward, v_speed_penalty, h_speed_penalty, fuel_penalty)
         
+        if self.action_steps >= self.ai_model.action_repeat or done or self.is_last_frame(frame):
+            # End of the action: get the next state and remember the experience
+            next_state = self.next_state = self.ai_model.get_state_vector()
+            self.action_steps = 0
+            dqn = self.ai_model.ai_model
+            if dqn is not None:  # None when flying a frozen policy
+                dqn.remember(self.state, self.action, self.action_reward, next_state, done)
+                # Train the AI model (as often as the training schedule says)
+                if self.learn:
+                    self.schedule.train(dqn)
 
-        # Remember the experience
-        self.ai_model.ai_model.remember(state, (thrust_idx, angle_idx), reward, next_state, done)
-        # Train the AI model
-        self.ai_model.ai_model.replay()
+    def is_last_frame(self, frame):
+        if self.integrator == 'adaptive':
+            return self.time >= self.total_time - 1e-9
+        return frame == self.num_frames - 1
 
-        if self.display:
+    def frames(self):
+        """Frame numbers of the episode (as many as the steps needed to simulate total_time)."""
+        if self.integrator == 'fixed':
+            yield from range(self.num_frames)
+            return
+        frame = 0
+        while self.time < self.total_time - 1e-9:
+            yield frame
+            frame += 1
+
+    def render(self, _=None):
+        """
+        Simulate the next time_warp physics frames and update the display.
+        Returns the artists that changed (for blitting): the lander marker and the time label.
+        """
+        simulated = 0
+        for frame in itertools.islice(self._frame_iter, self.time_warp):
+            self.update(frame)
+            simulated += 1
             if self.lander.crashed:
                 logging.info(f"Lander crashed at frame {frame}. Stopping simulation.")
                 self.lander_marker.set_marker('x')
-                self.ani.event_source.stop()
+                self._over = True
+                break
+            if self.is_last_frame(frame):
+                self._over = True
+        if not simulated:
+            self._over = True
+        self.lander_marker.set_data([self.lander.position[0]], [self.lander.position[1]])
+        self.time_text.set_text(f"t = {self.time:5.1f} s")
+        return self.lander_marker, self.time_text
+
+    def rendered_frames(self):
+        """Rendered frame numbers, until the episode is over."""
+        for rendered in itertools.count():
+            if self._over:
                 return
-            # Update the marker in the display
-            self.lander_marker.set_data([self.lander.position[0]], [self.lander.position[1]])
-            return self.lander_marker,
+            yield rendered
 
-    def setup_display(self):
-        """Setup the display for animation."""
-        self.fig, self.ax = plt.subplots(figsize=(10, 6))
+    def setup_display(self, offscreen=False):
+        """Setup the display for animation (offscreen: on an Agg canvas, without any GUI window)."""
+        if offscreen:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            self.fig = Figure(figsize=(10, 6))
+            FigureCanvasAgg(self.fig)
+            self.ax = self.fig.add_subplot()
+        else:
+            import matplotlib.pyplot as plt  # Imported on demand: headless runs never load matplotlib
+            self.fig, self.ax = plt.subplots(figsize=(10, 6))
 
         # Set the background color to black
         self.fig.patch.set_facecolor('black')
@@ -98,33 +188,80 @@ class Animation:
         # Remove axis ticks and labels
         self.ax.tick_params(left=False, bottom=False, labelleft=False, labelbottom=False)
 
-        # Initialize lander plot with a red marker
+        # Initialize lander plot with a red marker, and the simulated time
         self.lander_marker, = self.ax.plot([], [], 'ro', label="Lander")
+        self.time_text = self.ax.text(0.01, 0.97, '', transform=self.ax.transAxes, color="white", va='top')
 
         # Set the title in white and adjust the legend color
-        plt.legend(facecolor='black', edgecolor='white')
-        plt.title("Lander Descent Animation", color="white")
+        self.ax.legend(facecolor='black', edgecolor='white')
+        self.ax.set_title("Lander Descent Animation", color="white")
 
-    def run(self):
-        """Run the simulation."""
+    def reset(self):
+        """Reset the lander and the episode state before a run."""
         # Reset the lander to its initial position
         self.lander.reset(self.start_position)
         logging.info(f"Lander reset to start position: {self.start_position}")
+        self.stepper = LanderStepper(self.lander, self.planet)
+        self.time = 0.0
+        self.action_steps = 0
+        self.next_state = None
+        self.stats = EpisodeStats(start_fuel=self.lander.fuel)
+        if self.recorder is not None:
+            self.recorder.begin_episode(self.episode, self.planet)
+        self._frame_iter = self.frames()
+        self._over = False
+
+    def finish(self):
+        """Record the outcome of the episode once the run is over."""
+        self.stats.finish(self.lander)
+        if self.recorder is not None:
+            self.recorder.end_episode(self.stats.outcome)
+
+    def run(self):
+        """Run the simulation."""
+        self.reset()
         
         if self.display:
+            import matplotlib.pyplot as plt
+            from matplotlib.animation import FuncAnimation
+
             # Setup the display for animation
             self.setup_display()
 
-            # Create and run the animation
+            # Create and run the animation: time_warp physics frames per rendered frame, only the
+            # changed artists are redrawn (blitting)
             logging.info(f"Running animation for {self.total_time} seconds.")
             self.ani = FuncAnimation(
-                self.fig, self.update, frames=int(self.total_time / self.dt), 
-                blit=False, interval=100, repeat=False)
+                self.fig, self.render, frames=self.rendered_frames, init_func=lambda: (self.lander_marker, self.time_text),
+                save_count=-(-self.num_frames // self.time_warp), blit=True, interval=self.interval, repeat=False)
             plt.show()  # Only call plt.show() here for animation display
         else:
             # No display, just run the physics update
-            for frame in range(int(self.total_time / self.dt)):
+            for frame in self.frames():
                 self.update(frame)
                 if self.lander.crashed:
                     logging.info(f"Simulation stopped at frame {frame} due to crash.")
                     break
+        self.finish()
+
+    def export(self, filepath, fps=30, dpi=100):
+        """
+        Run the simulation and write it as a video (.mp4 and other ffmpeg formats) or a GIF, rendered
+        off-screen on an Agg canvas as fast as possible (time_warp physics frames per video frame).
+        """
+        from matplotlib import animation
+
+        if filepath.lower().endswith('.gif'):
+            writer = animation.PillowWriter(fps=fps)
+        elif animation.writers.is_available('ffmpeg'):
+            writer = animation.FFMpegWriter(fps=fps)
+        else:
+            raise RuntimeError(f"ffmpeg is needed to write {filepath} (GIF files only need Pillow)")
+
+        self.reset()
+        self.setup_display(offscreen=True)
+        with writer.saving(self.fig, filepath, dpi):
+            while not self._over:
+                self.render()
+                writer.grab_frame(facecolor=self.fig.get_facecolor())
+        self.finish()
@@ -1,3 +1,126 @@
 # -*- coding: utf-8 -*-
 # Contains utility functions (e.g., logging, plotting)
 # Logs data during simulation (optional)
+
+# utils/data_logger.py
+
+import json
+import os
+import time
+
+import numpy as np
+
+# Episode outcomes (column 'outcome')
+FLYING, LANDED, CRASHED = 0, 1, 2
+
+# Columns of the metrics log and their binary types
+METRIC_COLUMNS = (
+    ('episode', np.int64),
+    ('total_reward', np.float64),
+    ('distance_reward', np.float64),
+    ('vertical_speed_penalty', np.float64),
+    ('horizontal_speed_penalty', np.float64),
+    ('fuel_penalty', np.float64),
+    ('steps', np.int64),
+    ('outcome', np.int8),
+    ('fuel_used', np.float64),  # Percent of the tank
+    ('epsilon', np.float64),
+)
+
+
+class EpisodeStats:
+    """Statistics of one episode, accumulated step by step (see Animation.update)."""
+    def __init__(self, start_fuel=100):
+        self.start_fuel = start_fuel
+        self.total_reward = 0.0
+        self.distance_reward = 0.0
+        self.vertical_speed_penalty = 0.0
+        self.horizontal_speed_penalty = 0.0
+        self.fuel_penalty = 0.0
+        self.steps = 0
+        self.outcome = FLYING
+        self.fuel_used = 0.0
+
+    def add(self, reward, distance_reward, v_speed_penalty, h_speed_penalty, fuel_penalty):
+        """Add the reward components of one physics step."""
+        self.total_reward += reward
+        self.distance_reward += distance_reward
+        self.vertical_speed_penalty += v_speed_penalty
+        self.horizontal_speed_penalty += h_speed_penalty
+        self.fuel_penalty += fuel_penalty
+        self.steps += 1
+
+    def finish(self, lander):
+        """Record the outcome and fuel usage of the episode from the final lander state."""
+        self.outcome = LANDED if lander.is_landed else CRASHED if lander.crashed else FLYING
+        self.fuel_used = self.start_fuel - lander.fuel
+        return self
+
+
+class MetricsLogger:
+    """
+    Buffered, append-only columnar log of per-episode metrics.
+    Each column of METRIC_COLUMNS is a raw binary file <directory>/<column>.bin (read back with read_metrics).
+    Rows are buffered in preallocated arrays and written in batches, every flush_every episodes
+    or flush_interval seconds, whichever comes first.
+    Optionally mirrors (episode, total reward) rows to a space-separated text file (the old training_loss.csv).
+    """
+    def __init__(self, directory, flush_every=256, flush_interval=10.0, csv_path=None):
+        self.directory = directory
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.csv_path = csv_path
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'columns.json'), 'w') as f:
+            json.dump({name: np.dtype(dtype).str for name, dtype in METRIC_COLUMNS}, f)
+        self.buffers = {name: np.zeros(flush_every, dtype=dtype) for name, dtype in METRIC_COLUMNS}
+        self.count = 0  # Buffered rows
+        self.last_flush = time.monotonic()
+
+    def log(self, episode, stats, epsilon):
+        """Buffer the metrics of one finished episode (EpisodeStats)."""
+        i = self.count
+        buffers = self.buffers
+        buffers['episode'][i] = episode
+        buffers['total_reward'][i] = stats.total_reward
+        buffers['distance_reward'][i] = stats.distance_reward
+        buffers['vertical_speed_penalty'][i] = stats.vertical_speed_penalty
+        buffers['horizontal_speed_penalty'][i] = stats.horizontal_speed_penalty
+        buffers['fuel_penalty'][i] = stats.fuel_penalty
+        buffers['steps'][i] = stats.steps
+        buffers['outcome'][i] = stats.outcome
+        buffers['fuel_used'][i] = stats.fuel_used
+        buffers['epsilon'][i] = epsilon
+        self.count = i + 1
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if self.count >= self.flush_every or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Append the buffered rows to the column files."""
+        n = self.count
+        if n:
+            for name, buffer in self.buffers.items():
+                with open(os.path.join(self.directory, name + '.bin'), 'ab') as f:
+                    f.write(buffer[:n].tobytes())
+            if self.csv_path is not None:
+                rows = zip(self.buffers['episode'][:n].tolist(), self.buffers['total_reward'][:n].tolist())
+                with open(self.csv_path, 'a') as f:
+                    f.writelines(f"{episode} {reward}\n" for episode, reward in rows)
+        self.count = 0
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+
+
+def read_metrics(directory):
+    """Load a metrics log as a dict of column arrays (complete rows only)."""
+    columns = {}
+    for name, dtype in METRIC_COLUMNS:
+        path = os.path.join(directory, name + '.bin')
+        columns[name] = np.fromfile(path, dtype=dtype) if os.path.exists(path) else np.zeros(0, dtype=dtype)
+    n = min(len(column) for column in columns.values())
+    return {name: column[:n] for name, column in columns.items()}
@@ -2,74 +2,131 @@
 
 # utils/live_plot.py
 
-import matplotlib.pyplot as plt
-import pandas as pd
 import time
 import os
 import numpy as np
 
-def load_training_loss(filepath='training_loss.csv'):
-    """Load the training loss data from the CSV file."""
-    if os.path.exists(filepath):
-        # Read the file with space as the delimiter
-        data = pd.read_csv(filepath, sep=' ', header=None, names=['Epoch', 'Total Reward'])
-        return data
-    else:
-        return pd.DataFrame(columns=['Epoch', 'Total Reward'])
-
-def reset_curve(epoch_data):
-    """Helper function to reset curve index based on restart of epochs."""
-    curves = []
-    curve = []
-    last_epoch = epoch_data[0][0]  # Initialize the first epoch (extract the epoch value)
-    
-    for epoch, reward in epoch_data:
-        if epoch < last_epoch:  # Compare only the epoch value
-            curves.append(curve)
-            curve = []
-        curve.append(reward)
-        last_epoch = epoch
-    curves.append(curve)  # Append the last curve
-    return curves
-
-def live_plot_training_loss(filepath='training_loss.csv', refresh_interval=60):
-    """Plot the training loss live with periodic refreshes and a logarithmic scale."""
+
+class FileTail:
+    """
+    Reads the (episode, reward) rows appended to the training loss file since the previous call.
+    Only the new bytes are read, starting from the saved file offset; an incomplete last line is kept
+    for the next call. If the file shrinks (recreated), reading starts over from the beginning.
+    """
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.offset = 0
+        self.partial = b''
+
+    def read_rows(self):
+        """New rows as an array of shape (n, 2)."""
+        if not os.path.exists(self.filepath):
+            return np.zeros((0, 2))
+        if os.path.getsize(self.filepath) < self.offset:
+            self.offset, self.partial = 0, b''
+        with open(self.filepath, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+        self.offset += len(data)
+        data = self.partial + data
+        end = data.rfind(b'\n') + 1
+        data, self.partial = data[:end], data[end:]
+        values = np.array(data.split(), dtype=float)
+        return values[:len(values) // 2 * 2].reshape(-1, 2)
+
+
+class MinMaxDecimator:
+    """
+    Running min/max summary of a curve with a fixed point budget.
+    Points are grouped in consecutive buckets of `width` points, keeping the min and max of each;
+    when the budget is exceeded, adjacent buckets are merged pairwise and the width doubles.
+    Memory is O(budget) and adding points costs O(new points), however long the curve.
+    """
+    def __init__(self, budget=1000):
+        self.budget = budget + budget % 2  # Even, so buckets merge pairwise
+        self.width = 1  # Points per bucket
+        self.count = 0  # Points added so far
+        self.y_min = np.full(self.budget, np.inf)
+        self.y_max = np.full(self.budget, -np.inf)
+
+    def add(self, y):
+        y = np.asarray(y, dtype=float)
+        if not len(y):
+            return
+        while (self.count + len(y) - 1) // self.width >= self.budget:
+            self._merge()
+        buckets = (self.count + np.arange(len(y))) // self.width
+        np.minimum.at(self.y_min, buckets, y)
+        np.maximum.at(self.y_max, buckets, y)
+        self.count += len(y)
+
+    def _merge(self):
+        half = self.budget // 2
+        self.y_min[:half] = np.minimum(self.y_min[0::2], self.y_min[1::2])
+        self.y_max[:half] = np.maximum(self.y_max[0::2], self.y_max[1::2])
+        self.y_min[half:] = np.inf
+        self.y_max[half:] = -np.inf
+        self.width *= 2
+
+    def envelope(self):
+        """Points (x, y) of the min/max envelope: a vertical stroke from min to max per bucket."""
+        n = -(-self.count // self.width)  # Used buckets
+        x = np.repeat(np.arange(n) * self.width, 2)
+        y = np.column_stack((self.y_min[:n], self.y_max[:n])).ravel()
+        return x, y
+
+
+def live_plot_training_loss(filepath='training_loss.csv', refresh_interval=60, budget=1000):
+    """
+    Plot the training loss live with periodic refreshes and a logarithmic scale.
+    Each refresh only reads the rows appended since the previous one and draws every curve
+    (a new curve starts when the epoch number restarts) with at most 2 * budget points.
+    """
+    import matplotlib.pyplot as plt
     plt.ion()  # Turn on interactive mode for live plotting
     fig, ax = plt.subplots()
-    
+
     ax.set_yscale('log')
     ax.set_xlabel('Epoch')
     ax.set_ylabel('Total Reward (Positive, Log scale)')
     ax.set_title('Live Training Reward Plot (Logarithmic Scale)')
-    
+
+    tail = FileTail(filepath)
+    curves = []  # (decimator, line) per training run, the last one is the current curve
+    last_epoch = None
+
     while True:
-        # Load the latest data from the CSV
-        data = load_training_loss(filepath)
+        # Load the rows appended to the CSV since the last refresh
+        rows = tail.read_rows()
 
-        if not data.empty:
-            # Extract epoch and reward data
-            epoch_data = list(zip(data['Epoch'], data['Total Reward'].abs()))  # Ensure positive values for the log scale
-            
-            # Split data into separate curves when epoch number restarts
-            curves = reset_curve(epoch_data)
+        if len(rows):
+            epochs = rows[:, 0]
+            rewards = np.abs(rows[:, 1])  # Ensure positive values for the log scale
 
-            ax.clear()
-            ax.set_yscale('log')
-            ax.set_xlabel('Epoch')
-            ax.set_ylabel('Total Reward (Positive, Log scale)')
-            ax.set_title('Live Training Reward Plot (Logarithmic Scale)')
+            # Split data into separate curves when epoch number restarts
+            previous = np.concatenate(([-np.inf if last_epoch is None else last_epoch], epochs[:-1]))
+            starts = np.flatnonzero(epochs < previous)
+            for start, end in zip(np.concatenate(([0], starts)), np.concatenate((starts, [len(rows)]))):
+                if start == end:  # Restart on the first new row: no rows before it
+                    continue
+                if start in starts or not curves:
+                    line, = ax.plot([], [], color='red', linestyle='-', label='Current Curve')
+                    curves.append((MinMaxDecimator(budget), line))
+                curves[-1][0].add(rewards[start:end])
+            last_epoch = epochs[-1]
 
-            # Plot each curve
+            # Older curves in grey dotted lines, the current curve in red continuous line
             num_curves = len(curves)
-            for i, curve in enumerate(curves[:-1]):
-                intensity = (num_curves-1-i) / (num_curves - 1)  # Intensity based on curve age
-                grey_color = (intensity, intensity, intensity)  # Create a grey color
-                ax.plot(np.arange(len(curve)), curve, linestyle=':', color=grey_color)
-
-            # Plot the current curve in red continuous line
-            current_curve = curves[-1]
-            ax.plot(np.arange(len(current_curve)), current_curve, color='red', linestyle='-', label='Current Curve')
+            for i, (decimator, line) in enumerate(curves):
+                line.set_data(*decimator.envelope())
+                if i < num_curves - 1:
+                    intensity = (num_curves-1-i) / (num_curves - 1)  # Intensity based on curve age
+                    line.set_color((intensity, intensity, intensity))  # Grey color
+                    line.set_linestyle(':')
+                    line.set_label('_nolegend_')
 
+            ax.relim()
+            ax.autoscale_view()
             ax.legend()
             plt.draw()  # Update the plot
             plt.pause(0.1)  # Pause for a brief moment to allow the plot to update
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# Contains utility functions (e.g., logging, plotting)
+# Per-stage profiler of the simulation and training loop
+
+# utils/profiler.py
+
+import functools
+import importlib
+import json
+import time
+
+# Profiled stages: (module, attribute path, stage name)
+STAGES = (
+    ('utils.animation', 'Animation.run', 'episode'),
+    ('utils.animation', 'Animation.export', 'episode'),
+    ('ai_models.basic_ai', 'BasicAI.get_state_vector', 'get_state_vector'),
+    ('lander.lander', 'Lander.sense_terrain', 'sense_terrain'),
+    ('ai_models.dqn_ai', 'DQNAI.act', 'act'),
+    ('ai_models.numpy_policy', 'NumpyPolicy.act', 'act'),
+    ('environments.physics', 'LanderStepper.step', 'update_lander_state'),
+    ('environments.physics', 'LanderStepper.step_adaptive', 'update_lander_state'),  # integrator='adaptive'
+    ('utils.animation', 'compute_reward', 'compute_reward'),  # Name used by Animation.update
+    ('ai_models.dqn_ai', 'DQNAI.remember', 'remember'),
+    ('ai_models.dqn_ai', 'DQNAI.replay', 'replay'),
+    ('ai_models.dqn_ai', 'DQNAI.learn', 'learn'),
+)
+
+
+class Profiler:
+    """
+    Records the cumulative time and number of calls of the main stages of an episode
+    (state vector, terrain sensing, policy, physics, reward, replay memory and learning),
+    for each episode and for the whole run.
+    install() wraps the stage functions in place; nothing is wrapped (no cost at all) until then.
+    Nested stages are tracked by call stack, so the report gives both the total and the self time
+    of each stack and can be exported as JSON or as folded stacks (flamegraph.pl, speedscope...).
+    Only the calls made in this process are seen (not the ones of actor processes).
+    """
+    def __init__(self):
+        self.stacks = {}  # Stack of stage names (tuple) -> [calls, total time, self time], whole run
+        self.episodes = []  # Per-episode {stage: [calls, total time]}
+        self._episode = {}
+        self._stack = []  # Active stages: [stack, start time, time spent in sub-stages]
+        self._patched = []
+
+    def install(self, stages=STAGES):
+        """Wrap the stage functions (module attributes and class methods) with timers."""
+        for module_name, path, name in stages:
+            module = importlib.import_module(module_name)
+            *owners, attribute = path.split('.')
+            owner = module
+            for owner_name in owners:
+                owner = getattr(owner, owner_name)
+            original = owner.__dict__[attribute] if isinstance(owner, type) else getattr(owner, attribute)
+            self._patched.append((owner, attribute, original))
+            setattr(owner, attribute, self.wrap(name, original, episode=(name == 'episode')))
+        return self
+
+    def uninstall(self):
+        """Restore the original functions."""
+        for owner, attribute, original in reversed(self._patched):
+            setattr(owner, attribute, original)
+        self._patched = []
+
+    def wrap(self, name, func, episode=False):
+        """Timed version of func, recorded as stage `name` (episode=True: also closes an episode)."""
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            stack = (self._stack[-1][0] if self._stack else ()) + (name,)
+            frame = [stack, time.perf_counter(), 0.0]
+            self._stack.append(frame)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - frame[1]
+                self._stack.pop()
+                if self._stack:
+                    self._stack[-1][2] += elapsed
+                record = self.stacks.setdefault(stack, [0, 0.0, 0.0])
+                record[0] += 1
+                record[1] += elapsed
+                record[2] += elapsed - frame[2]
+                if name not in stack[:-1]:  # Recursive calls are already counted by the outer one
+                    stage = self._episode.setdefault(name, [0, 0.0])
+                    stage[0] += 1
+                    stage[1] += elapsed
+                if episode:
+                    self.episodes.append(self._episode)
+                    self._episode = {}
+        return timed
+
+    def totals(self):
+        """Whole-run {stage: (calls, total time)} (time of nested calls counted once)."""
+        totals = {}
+        for stack, (calls, total, _) in self.stacks.items():
+            name = stack[-1]
+            if name not in stack[:-1]:
+                stage = totals.setdefault(name, [0, 0.0])
+                stage[0] += calls
+                stage[1] += total
+        return {name: tuple(stage) for name, stage in totals.items()}
+
+    def report(self):
+        """Text table of the time spent in every stage over the whole run."""
+        totals = self.totals()
+        reference = totals['episode'][1] if 'episode' in totals else sum(t for _, t in totals.values())
+        lines = [f"{'stage':<22}{'calls':>10}{'total (s)':>12}{'% episode':>11}{'per call (us)':>15}"]
+        for name, (calls, total) in sorted(totals.items(), key=lambda item: -item[1][1]):
+            share = 100 * total / reference if reference else 0
+            lines.append(f"{name:<22}{calls:>10}{total:>12.3f}{share:>11.1f}{1e6 * total / calls:>15.1f}")
+        lines.append(f"{len(self.episodes)} episodes")
+        return "\n".join(lines)
+
+    def to_json(self, filepath):
+        """Export the whole-run stage totals, the stacks and the per-episode stage totals as JSON."""
+        data = {'stages': {name: {'calls': calls, 'total_s': total} for name, (calls, total) in self.totals().items()},
+                'stacks': [{'stack': list(stack), 'calls': calls, 'total_s': total, 'self_s': self_time}
+                           for stack, (calls, total, self_time) in self.stacks.items()],
+                'episodes': [{name: {'calls': calls, 'total_s': total} for name, (calls, total) in episode.items()}
+                             for episode in self.episodes]}
+        with open(filepath, 'w') as f:
+            json.dump(data, f, indent=1)
+
+    def to_folded(self, filepath):
+        """Export the self time of every stack in folded format ("a;b;c <microseconds>" per line)."""
+        with open(filepath, 'w') as f:
+            for stack, (_, _, self_time) in self.stacks.items():
+                f.write(f"{';'.join(stack)} {int(round(self_time * 1e6))}\n")
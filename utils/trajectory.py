@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+# Contains utility functions (e.g., logging, plotting)
+# Records episode trajectories and plays them back without simulation
+
+# utils/trajectory.py
+
+import glob
+import os
+
+import numpy as np
+
+from environments.scenario_bank import NUM_TERRAIN_POINTS
+from utils.data_logger import FLYING
+
+# One row per physics step (54 bytes, packed)
+STEP_DTYPE = np.dtype([
+    ('time', np.float32),
+    ('x', np.float32),
+    ('y', np.float32),
+    ('vx', np.float32),
+    ('vy', np.float32),
+    ('angle', np.float32),
+    ('fuel', np.float32),
+    ('thrust', np.float32),
+    ('thrust_idx', np.int8),
+    ('angle_idx', np.int8),
+    ('reward', np.float32),
+    ('distance_reward', np.float32),
+    ('vertical_speed_penalty', np.float32),
+    ('horizontal_speed_penalty', np.float32),
+    ('fuel_penalty', np.float32),
+])
+
+# One row per episode: where its steps are and the planet to draw them on
+EPISODE_DTYPE = np.dtype([
+    ('episode', np.int64),
+    ('start', np.int64),  # First row in the steps file of the chunk
+    ('length', np.int64),
+    ('outcome', np.int8),  # FLYING, LANDED or CRASHED (utils.data_logger)
+    ('total_reward', np.float64),
+    ('ground_length', np.float64),
+    ('atmosphere_thickness', np.float64),
+    ('landing_zone', np.float64, (2, 2)),
+    ('terrain_y', np.float32, (NUM_TERRAIN_POINTS,)),
+])
+
+
+class TrajectoryRecorder:
+    """
+    Records the per-step state, action and reward components of episodes into compact chunked files:
+    <directory>/steps_<n>.npy (STEP_DTYPE rows) and <directory>/episodes_<n>.npy (EPISODE_DTYPE rows),
+    read back with TrajectoryReader. Steps are written into a preallocated buffer (one row assignment
+    per step) and a chunk is saved once chunk_steps steps of complete episodes have been recorded.
+    """
+    def __init__(self, directory, chunk_steps=65536):
+        self.directory = directory
+        self.chunk_steps = chunk_steps
+        os.makedirs(directory, exist_ok=True)
+        self.chunk = len(glob.glob(os.path.join(directory, 'episodes_*.npy')))  # Append after existing chunks
+        self.steps = np.zeros(chunk_steps, dtype=STEP_DTYPE)
+        self.count = 0  # Buffered steps
+        self.episodes = []  # Buffered episode rows
+        self.episode = None  # Row of the episode being recorded
+
+    def begin_episode(self, episode, planet):
+        """Start recording an episode on the given planet."""
+        terrain_y = [y for _, y in planet.terrain]
+        if len(terrain_y) != NUM_TERRAIN_POINTS:
+            raise ValueError(f"Terrains of {NUM_TERRAIN_POINTS} points expected, got {len(terrain_y)}")
+        self.episode = np.zeros((), dtype=EPISODE_DTYPE)
+        self.episode['episode'] = episode
+        self.episode['start'] = self.count
+        self.episode['ground_length'] = planet.ground_length
+        self.episode['atmosphere_thickness'] = planet.atmosphere_thickness
+        self.episode['landing_zone'] = planet.landing_zone
+        self.episode['terrain_y'] = terrain_y
+
+    def record(self, time, lander, thrust_idx, angle_idx, reward, distance_reward, v_speed_penalty, h_speed_penalty,
+               fuel_penalty):
+        """Record one physics step (lander state after the step, action and reward components)."""
+        if self.count == len(self.steps):
+            self.steps = np.concatenate((self.steps, np.zeros(len(self.steps), dtype=STEP_DTYPE)))
+        x, y = lander.position
+        vx, vy = lander.velocity
+        self.steps[self.count] = (time, x, y, vx, vy, lander.angle, lander.fuel, lander.thrust, thrust_idx, angle_idx,
+                                  reward, distance_reward, v_speed_penalty, h_speed_penalty, fuel_penalty)
+        self.count += 1
+
+    def end_episode(self, outcome=FLYING):
+        """Finish the episode being recorded (outcome as in EpisodeStats)."""
+        episode = self.episode
+        episode['length'] = self.count - episode['start']
+        episode['outcome'] = outcome
+        episode['total_reward'] = self.steps['reward'][episode['start']:self.count].sum(dtype=np.float64)
+        self.episodes.append(episode)
+        self.episode = None
+        if self.count >= self.chunk_steps:
+            self.flush()
+
+    def add_episode(self, episode, planet, steps, outcome=FLYING):
+        """Record a whole episode at once, from a dict of step columns (missing columns are zero)."""
+        self.begin_episode(episode, planet)
+        n = len(steps['x'])
+        while self.count + n > len(self.steps):
+            self.steps = np.concatenate((self.steps, np.zeros(len(self.steps), dtype=STEP_DTYPE)))
+        rows = self.steps[self.count:self.count + n]
+        rows[...] = 0
+        for name, column in steps.items():
+            rows[name] = column
+        self.count += n
+        self.end_episode(outcome)
+
+    def flush(self):
+        """Save the complete episodes recorded so far as a new chunk."""
+        if not self.episodes:
+            return
+        end = self.count if self.episode is None else int(self.episode['start'])
+        np.save(os.path.join(self.directory, f'steps_{self.chunk:05d}.npy'), self.steps[:end])
+        np.save(os.path.join(self.directory, f'episodes_{self.chunk:05d}.npy'), np.array(self.episodes))
+        self.chunk += 1
+        self.episodes = []
+        # Keep the steps of an episode in progress at the start of the buffer
+        self.steps[:self.count - end] = self.steps[end:self.count]
+        self.count -= end
+        if self.episode is not None:
+            self.episode['start'] = 0
+
+    def close(self):
+        self.flush()
+
+
+class TrajectoryReader:
+    """
+    Recorded trajectories of a directory (and of its subdirectories, e.g. one per actor process).
+    The chunk files are memory-mapped: opening a large recording is instant and only the
+    episodes looked at are read.
+    """
+    def __init__(self, directory):
+        self.chunks = []  # (episodes, steps) per chunk
+        for path in sorted(glob.glob(os.path.join(directory, '**', 'episodes_*.npy'), recursive=True)):
+            steps_path = os.path.join(os.path.dirname(path), 'steps_' + os.path.basename(path)[len('episodes_'):])
+            self.chunks.append((np.load(path), np.load(steps_path, mmap_mode='r')))
+        self.index = [(chunk, row) for chunk, (episodes, _) in enumerate(self.chunks) for row in range(len(episodes))]
+
+    def __len__(self):
+        return len(self.index)
+
+    def episodes(self):
+        """Rows (EPISODE_DTYPE) of all the recorded episodes, in index order."""
+        if not self.chunks:
+            return np.zeros(0, dtype=EPISODE_DTYPE)
+        return np.concatenate([episodes for episodes, _ in self.chunks])
+
+    def find(self, episode):
+        """Index of the last recording of episode number `episode`."""
+        numbers = self.episodes()['episode']
+        matches = np.flatnonzero(numbers == episode)
+        if not len(matches):
+            raise KeyError(f"Episode {episode} was not recorded")
+        return int(matches[-1])
+
+    def __getitem__(self, index):
+        """(episode row, step rows) of the recorded episode at `index`."""
+        chunk, row = self.index[index]
+        episodes, steps = self.chunks[chunk]
+        episode = episodes[row]
+        return episode, steps[episode['start']:episode['start'] + episode['length']]
+
+
+def play(directory, index=-1, speed=1.0, filepath=None):
+    """
+    Animate a recorded episode (default: the last one) from its file only: no physics, AI model or torch.
+    speed: playback speed relative to the simulated time. filepath: save the animation (e.g. .gif, .mp4)
+    instead of showing it.
+    """
+    import matplotlib.pyplot as plt  # Imported on demand, like the other displays
+    from matplotlib.animation import FuncAnimation
+
+    episode, steps = TrajectoryReader(directory)[index]
+    x = np.asarray(steps['x'])
+    y = np.asarray(steps['y'])
+    times = np.asarray(steps['time'])
+    interval = 1000 * float(np.median(np.diff(times))) / speed if len(times) > 1 else 100
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    fig.patch.set_facecolor('black')
+    ax.set_facecolor('black')
+    ground_length = episode['ground_length']
+    ax.plot(np.linspace(0, ground_length, NUM_TERRAIN_POINTS), episode['terrain_y'], color="white", label="Terrain")
+    ax.set_ylim(-200, episode['atmosphere_thickness'])
+    ax.set_xlim(0, ground_length)
+    ax.tick_params(left=False, bottom=False, labelleft=False, labelbottom=False)
+    marker, = ax.plot([], [], 'ro', label="Lander")
+    text = ax.text(0.01, 0.97, '', transform=ax.transAxes, color="white", va='top', family='monospace')
+    plt.legend(facecolor='black', edgecolor='white')
+    plt.title(f"Episode {episode['episode']} replay", color="white")
+
+    def update(frame):
+        marker.set_data([x[frame]], [y[frame]])
+        step = steps[frame]
+        text.set_text(f"t={step['time']:6.1f}s  v=({step['vx']:6.1f}, {step['vy']:6.1f})  "
+                      f"fuel={step['fuel']:5.1f}  thrust={step['thrust']:.2f}")
+        return marker, text
+
+    animation = FuncAnimation(fig, update, frames=len(steps), interval=interval, blit=True, repeat=False)
+    if filepath:
+        animation.save(filepath, fps=max(1, int(round(1000 / interval))))
+    else:
+        plt.show()
+    return animation